@@ -0,0 +1,267 @@
+#----------------------------------------------------------------------------#
+# Imports
+#----------------------------------------------------------------------------#
+
+import asyncio
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from flask import has_request_context, request_started
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session
+from werkzeug.exceptions import HTTPException
+from metrics import track_pool
+from models import set_statement_timeout
+from replicas import replica_router
+
+#----------------------------------------------------------------------------#
+# Async Serving.
+# Under an ASGI server (asgi.py) the read routes run as coroutines on an
+# async engine, so a worker waiting on Postgres holds no thread and a page
+# can issue its independent queries at once, each on its own connection.
+# Every other route is the regular Flask view, run on a thread pool.
+# Async views go through the same before/after_request hooks, error
+# handlers and signals as the WSGI ones.
+#----------------------------------------------------------------------------#
+
+# Endpoint -> coroutine view, filled by @async_view in the blueprints
+async_views = {}
+
+
+def async_view(endpoint):
+    def decorator(f):
+        async_views[endpoint] = f
+        return f
+    return decorator
+
+
+class AsyncReadSession(Session):
+    # Own class so the statement timeout listener does not also fire for
+    # Flask-SQLAlchemy's sessions
+    pass
+
+
+event.listen(AsyncReadSession, 'after_begin', set_statement_timeout)
+
+
+class AsyncDatabase(object):
+
+    def __init__(self):
+        self.engines = {}
+
+    def init_app(self, app):
+        self.app = app
+        self.driver = app.config.get('ASYNC_DATABASE_DRIVER', 'postgresql+psycopg')
+        self.url = app.config.get('ASYNC_DATABASE_URL') or self.async_url(app.config['SQLALCHEMY_DATABASE_URI'])
+        options = dict(app.config['SQLALCHEMY_ENGINE_OPTIONS'])
+        # The async engine brings its own (asyncio-aware) pool class
+        options.pop('poolclass', None)
+        self.options = options
+        self.capacity = options.get('pool_size', 5) + options.get('max_overflow', 10)
+        self.engines = {}
+
+    def async_url(self, url):
+        return make_url(url).set(drivername=self.driver).render_as_string(hide_password=False)
+
+    def engine(self, url=None):
+        # Created on first use, in the worker process and on its event loop
+        url = url or self.url
+        if url not in self.engines:
+            from sqlalchemy.ext.asyncio import create_async_engine
+            engine = create_async_engine(url, **self.options)
+            name = 'async' if url == self.url else f'async-replica{len(self.engines)}'
+            track_pool(engine.sync_engine.pool, self.capacity, name)
+            self.engines[url] = engine
+        return self.engines[url]
+
+    def engine_for_request(self):
+        # Follows the replica router: same replica choice, same stickiness
+        replica = replica_router.engine_for_request() if has_request_context() else None
+        if replica is None:
+            return self.engine()
+        return self.engine(self.async_url(replica.url.render_as_string(hide_password=False)))
+
+    def session(self):
+        from sqlalchemy.ext.asyncio import AsyncSession
+        return AsyncSession(self.engine_for_request(), sync_session_class=AsyncReadSession, expire_on_commit=False)
+
+    async def execute(self, statement):
+        # One session, and so one connection, per statement: statements
+        # awaited together with asyncio.gather run concurrently
+        async with self.session() as session:
+            return await session.execute(statement)
+
+    async def get(self, model, id):
+        async with self.session() as session:
+            return await session.get(model, id)
+
+    async def dispose(self):
+        for engine in self.engines.values():
+            await engine.dispose()
+        self.engines = {}
+
+
+async_db = AsyncDatabase()
+
+#----------------------------------------------------------------------------#
+# ASGI Application.
+#----------------------------------------------------------------------------#
+
+# Request bodies larger than this are spooled to disk
+BODY_SPOOL_SIZE = 1024 * 1024
+
+
+class ASGIApp(object):
+
+    def __init__(self, app):
+        self.app = app
+        async_db.init_app(app)
+        self.executor = ThreadPoolExecutor(app.config.get('ASGI_THREADS', 10), thread_name_prefix='wsgi')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+        if scope['type'] == 'websocket':
+            # No websocket routes: refuse the handshake
+            await receive()
+            await send({'type': 'websocket.close'})
+            return
+        if scope['type'] != 'http':
+            return
+
+        environ = self.environ(scope, await self.read_body(receive))
+        view, view_args = self.match(environ)
+        if view is None:
+            status, headers, body = await self.run_wsgi(environ)
+        else:
+            status, headers, body = await self.run_async(environ, view, view_args)
+        await send({
+            'type': 'http.response.start',
+            'status': int(status.split(' ', 1)[0]),
+            'headers': [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers],
+        })
+        try:
+            async for chunk in body:
+                if chunk:
+                    await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+        finally:
+            await body.aclose()
+        await send({'type': 'http.response.body', 'body': b''})
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await async_db.dispose()
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def read_body(self, receive):
+        body = tempfile.SpooledTemporaryFile(BODY_SPOOL_SIZE)
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                break
+            body.write(message.get('body', b''))
+            if not message.get('more_body'):
+                break
+        body.seek(0)
+        return body
+
+    def environ(self, scope, body):
+        root_path = scope.get('root_path', '')
+        path = scope['path']
+        if root_path and path.startswith(root_path):
+            path = path[len(root_path):]
+        server = scope.get('server') or ('localhost', 80)
+        client = scope.get('client') or ('', 0)
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': root_path.encode('utf-8').decode('latin-1'),
+            'PATH_INFO': path.encode('utf-8').decode('latin-1'),
+            'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+            'SERVER_NAME': server[0],
+            'SERVER_PORT': str(server[1]),
+            'SERVER_PROTOCOL': 'HTTP/' + scope.get('http_version', '1.1'),
+            'REMOTE_ADDR': client[0],
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': body,
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': True,
+            'wsgi.run_once': False,
+        }
+        for name, value in scope.get('headers', []):
+            name, value = name.decode('latin-1').upper().replace('-', '_'), value.decode('latin-1')
+            if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+                name = 'HTTP_' + name
+            environ[name] = f'{environ[name]},{value}' if name in environ else value
+        return environ
+
+    def match(self, environ):
+        # Unknown paths and methods are left for Flask to answer
+        adapter = self.app.url_map.bind_to_environ(environ, server_name=self.app.config.get('SERVER_NAME'))
+        try:
+            endpoint, view_args = adapter.match()
+        except HTTPException:
+            return None, None
+        return async_views.get(endpoint), view_args
+
+    async def run_async(self, environ, view, view_args):
+        # Flask's wsgi_app() and full_dispatch_request(), awaiting the view
+        app = self.app
+        ctx = app.request_context(environ)
+        error = None
+        try:
+            ctx.push()
+            try:
+                try:
+                    request_started.send(app, _async_wrapper=app.ensure_sync)
+                    rv = app.preprocess_request()
+                    if rv is None:
+                        rv = await view(**view_args)
+                except Exception as e:
+                    rv = app.handle_user_exception(e)
+                response = app.finalize_request(rv)
+            except Exception as e:
+                error = e
+                response = app.handle_exception(e)
+            app_iter, status, headers = response.get_wsgi_response(environ)
+        finally:
+            ctx.pop(error)
+        if response.is_streamed:
+            return status, headers, self.iterate(app_iter)
+        return status, headers, self.iterate_buffered(app_iter)
+
+    async def run_wsgi(self, environ):
+        loop = asyncio.get_running_loop()
+        started = {}
+
+        def start_response(status, headers, exc_info=None):
+            started['status'], started['headers'] = status, headers
+
+        app_iter = await loop.run_in_executor(self.executor, self.app, environ, start_response)
+        return started['status'], started['headers'], self.iterate(app_iter)
+
+    async def iterate(self, app_iter):
+        # Chunks are produced on the pool: streamed exports query as they go
+        loop = asyncio.get_running_loop()
+        iterator = iter(app_iter)
+        try:
+            while True:
+                chunk = await loop.run_in_executor(self.executor, next, iterator, None)
+                if chunk is None:
+                    break
+                yield chunk
+        finally:
+            if hasattr(app_iter, 'close'):
+                await loop.run_in_executor(self.executor, app_iter.close)
+
+    async def iterate_buffered(self, app_iter):
+        for chunk in app_iter:
+            yield chunk
@@ -1,601 +1,244 @@
 #----------------------------------------------------------------------------#
 # Imports
 #----------------------------------------------------------------------------#
-import json
-import dateutil.parser
-import babel
-from flask import Flask, render_template, request, Response, flash, redirect, url_for, abort
-from flask_moment import Moment
-from flask_sqlalchemy import SQLAlchemy
-import logging
-from logging import Formatter, FileHandler
-from flask_wtf import Form
-from forms import *
-from flask_migrate import Migrate
-from models import *
+import os
 import sys
-
+import time
+from flask import Flask, render_template
+from flask_moment import Moment
+import click
 
 #----------------------------------------------------------------------------#
 # App Config.
+# create_app() builds the application; blueprints and extensions are
+# imported inside it so that importing this module stays cheap.
 #----------------------------------------------------------------------------#
 
-app = Flask(__name__)
-moment = Moment(app)
-db = db_setup(app)
 
-#----------------------------------------------------------------------------#
-# Helping Methods.
-#----------------------------------------------------------------------------#
+def create_app(config=None):
+    started = time.perf_counter()
+    app = Flask(__name__)
+    app.config.from_object('config')
+    app.config.update(config or {})
+
+    from models import db_setup
+    from metrics import metrics
+    from budgets import query_budgets
+    from formatting import date_formatter
+    from assets import assets
+    from compression import compression
+    Moment(app)
+    db_setup(app)
+    metrics.init_app(app)
+    query_budgets.init_app(app)
+    date_formatter.init_app(app)
+    assets.init_app(app)
+    compression.init_app(app)
+    register_template_cache(app)
+
+    from views import venues, artists, shows, pages
+    for blueprint in (venues.bp, artists.bp, shows.bp, pages.bp):
+        app.register_blueprint(blueprint)
+    register_error_handlers(app)
+    register_logging(app)
+    register_commands(app)
+
+    # Measured by "python -m benchmarks cold-start"; logged when over budget
+    app.config['STARTUP_SECONDS'] = elapsed = time.perf_counter() - started
+    budget = app.config.get('COLD_START_BUDGET_MS')
+    if budget and elapsed * 1000 > budget:
+        app.logger.warning('create_app() took %.0fms, cold-start budget is %dms', elapsed * 1000, budget)
+    return app
 
+#-------------------------------App Handling---------------------------------------#
 
-def format_datetime(value, format='medium'):
-    date = dateutil.parser.parse(value)
-    if format == 'full':
-        format = "EEEE MMMM, d, y 'at' h:mma"
-    elif format == 'medium':
-        format = "EE MM, dd, y h:mma"
-    return babel.dates.format_datetime(date, format)
 
+def register_error_handlers(app):
 
-app.jinja_env.filters['datetime'] = format_datetime
+    @app.errorhandler(404)
+    def not_found_error(error):
+        return render_template('errors/404.html'), 404
 
+    @app.errorhandler(500)
+    def server_error(error):
+        return render_template('errors/500.html'), 500
 
-def is_next(date):
-    curr_date = datetime.now()
-    if date > curr_date:
-        return True
-    else:
-        return False
 
-#----------------------------------------------------------------------------#
-# Controllers.
-#----------------------------------------------------------------------------#
+def register_template_cache(app):
+    # Compiled templates are kept on disk, so a new worker loads bytecode
+    # instead of parsing every template on its first requests
+    directory = app.config.get('TEMPLATE_CACHE_DIR')
+    if not directory:
+        return
+    from jinja2 import FileSystemBytecodeCache
+    os.makedirs(directory, exist_ok=True)
+    # Whitespace stripping changes the compiled code but not the source
+    # Jinja keys on, so each variant gets its own files
+    variant = 'stripped' if app.config.get('COMPRESS_STRIP_WHITESPACE') else 'plain'
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache(directory, f'fyyur-{variant}-%s.cache')
 
-#-------------------------------Venues---------------------------------------#
-
-#  1-Create Venue
-#  ----------------------------------------------------------------
-
-
-@app.route('/venues/create', methods=['GET'])
-def create_venue_form():
-    form = VenueForm()
-    return render_template('forms/new_venue.html', form=form)
-
-
-@app.route('/venues/create', methods=['POST'])
-def create_venue_submission():
-    error = False
-    try:
-        # Get User Input
-        req = request.form
-        name = req['name']
-        city = req['city']
-        state = req['state']
-        address = req['address']
-        phone = req['phone']
-        genres = req.getlist('genres')
-        facebook_link = req['facebook_link']
-        # Craete Instanse from Venue
-        venue = Venue(name=name, genres=genres, address=address, city=city, state=state, phone=phone, facebook_link=facebook_link)
-        # Insert Venue Instanse
-        venue.insert()
-    except:
-        db.session.rollback()
-        error = True
-        print(sys.exc_info())
-    finally:
-        db.session.close()
 
-    # Check Error Status
-    if error:
-        # on unsuccessful db insert
-        flash('An error occurred. Venue could not be listed.')
-        return render_template('pages/home.html')
-    else:
-        # on successful db insert, flash success
-        flash('Venue' + request.form['name'] + ' was successfully listed!')
-        return render_template('pages/home.html')
-
-#  2-Read Venues
-#  ----------------------------------------------------------------
-
-
-@app.route('/venues')
-def venues():
-    error = False
-    body = []
-    try:
-        # Filter & Group all venues by Location
-        venues = Venue.query.all()
-        locations = db.session.query(Venue.city, Venue.state).group_by(Venue.city, Venue.state).all()
-        for location in locations:
-            body.append({
-                "city": location.city,
-                "state": location.state,
-                "venues": []
-            })
-
-        for venue in venues:
-            num_upcoming_shows = 0
-            shows = Show.query.filter_by(venue_id=venue.id).all()
-
-            # Calculate no. of coming shows
-            for show in shows:
-                if is_next(show.date):
-                    num_upcoming_shows += 1
-
-            # Add Venues to its location
-            for v_location in body:
-                if venue.state == v_location['state'] and venue.city == v_location['city']:
-                    v_location['venues'].append({
-                        "id": venue.id,
-                        "name": venue.name,
-                        "num_upcoming_shows": num_upcoming_shows
-                    })
-    except:
-        db.session.rollback()
-        error = True
-        print(sys.exc_info())
-    finally:
-        db.session.close()
+def register_logging(app):
+    if not app.debug:
+        # JSON lines written by a background thread; see logs.py
+        from logs import structured_log
+        structured_log.init_app(app)
 
-    # Check Error Status
-    if not error:
-        return render_template('pages/venues.html', areas=body)
-    else:
-        abort(500)
-
-#  3-Delete Venues
-#  ----------------------------------------------------------------
-
-
-@app.route('/venues/<venue_id>', methods=['DELETE'])
-def delete_venue(venue_id):
-    error = False
-    try:
-        # Get Required Venue
-        venue = Venue.query.get(venue_id)
-        venue.delete()
-    except():
-        db.session.rollback()
-        error = True
-    finally:
-        db.session.close()
-
-    # Check Error Status
-    if error:
-        # on Error State
-        flash('An error occurred. Venue could not be deleted.')
-        return render_template('pages/home.html')
-    else:
-        return redirect(url_for('venues'))
-
-#  4-Venues Search
-#  ----------------------------------------------------------------
-
-
-@app.route('/venues/search', methods=['POST'])
-def search_venues():
-    response = {}
-    error = False
-    try:
-        search_term = request.form.get('search_term')
-        search = f"%{search_term}%"
-        venues = Venue.query.filter(Venue.name.ilike(f"%{search}%")).all()
-        response['count'] = len(venues)
-        data = []
-
-        for venue in venues:
-            num_upcoming_shows = 0
-            shows = Show.query.filter_by(venue_id=venue.id).all()
-
-            # Calculate no. of coming shows
-            for show in shows:
-                if is_next(show.date):
-                    num_upcoming_shows += 1
-
-            data.append({
-                "id": venue.id,
-                "name": venue.name,
-                "num_upcoming_shows": num_upcoming_shows,
-            })
-        response['data'] = data
-
-    except:
-        db.session.rollback()
-        error = True
-        print(sys.exc_info())
-    finally:
-        db.session.close()
-
-    # Check Error Status
-    if not error:
-        return render_template('pages/search_venues.html', results=response, search_term=request.form.get('search_term', ''))
-    else:
-        abort(500)
-
-#  5-Venues Details
-#  ----------------------------------------------------------------
-
-
-@app.route('/venues/<int:venue_id>', methods=['GET'])
-def show_venue(venue_id):
-    venue = Venue.query.get(venue_id)
-    data = venue.format()
-    shows = Show.query.join(Venue, Show.venue_id == venue_id).all()
-    upcoming_shows_count = 0
-    past_shows_count = 0
-    upcoming_shows = []
-    past_shows = []
-    for show in shows:
-        if is_next(show.date):
-            upcoming_shows_count += 1
-            upcoming_shows.append({
-                "artist_id": show.artist_id,
-                "artist_name": show.artist.name,
-                "artist_image_link": show.artist.image_link,
-                "start_time": str(show.date)
-            })
-        else:
-            past_shows_count += 1
-            past_shows.append({
-                "artist_id": show.artist_id,
-                "artist_name": show.artist.name,
-                "artist_image_link": show.artist.image_link,
-                "start_time": str(show.date)
-            })
-    data['upcoming_shows'] = upcoming_shows
-    data['past_shows'] = past_shows
-    data['past_shows_count'] = past_shows_count
-    data['upcoming_shows_count'] = upcoming_shows_count
-    return render_template('pages/show_venue.html', venue=data)
-
-#  5-Edit Venue
-#  ----------------------------------------------------------------
-
-
-@app.route('/venues/<int:venue_id>/edit', methods=['GET'])
-def edit_venue(venue_id):
-    venue = Venue.query.get(venue_id)
-    form = VenueForm(obj=venue)
-    return render_template('forms/edit_venue.html', form=form, venue=venue)
-
-
-@app.route('/venues/<int:venue_id>/edit', methods=['POST'])
-def edit_venue_submission(venue_id):
-    error = False
-    try:
-        venue = Venue.query.get(venue_id)
-        form = VenueForm(request.form, obj=venue)
-        form.populate_obj(venue)
-        venue.update()
-    except:
-        db.session.rollback()
-        error = True
-        print(sys.exc_info())
-    finally:
-        db.session.close()
-
-    # Check Error Status
-    if not error:
-        return redirect(url_for('show_venue', venue_id=venue_id))
-    else:
-        abort(500)
-
-
-#-------------------------------Artists---------------------------------------#
-
-#  1-Create Artist
-#  ----------------------------------------------------------------
-@app.route('/artists/create', methods=['GET'])
-def create_artist_form():
-    form = ArtistForm()
-    return render_template('forms/new_artist.html', form=form)
-
-
-@app.route('/artists/create', methods=['POST'])
-def create_artist_submission():
-    error = False
-    body = {}
-    try:
-        # Get User Input
-        req = request.form
-        name = req['name']
-        city = req['city']
-        state = req['state']
-        phone = req['phone']
-        genres = req.getlist('genres')
-        facebook_link = req['facebook_link']
-        # Craete Instanse from Artist
-        artist = Artist(name=name, genres=genres, city=city, state=state, phone=phone, facebook_link=facebook_link)
-        # Insert Artist Instanse
-        artist.insert()
-    except:
-        db.session.rollback()
-        error = True
-        print(sys.exc_info())
-    finally:
-        db.session.close()
-
-    # Check Error Status
-    if error:
-        # on unsuccessful db insert
-        flash('An error occurred. Artist could not be listed.')
-        return render_template('pages/home.html')
-    else:
-        # on successful db insert, flash success
-        flash('Artist ' + request.form['name'] + ' was successfully listed!')
-        return render_template('pages/home.html')
-
-#  2-Read Artist
-#  ----------------------------------------------------------------
-
-
-@app.route('/artists')
-def artists():
-    error = False
-    data = []
-    try:
-        # Order all artists by name
-        artists = Artist.query.order_by("name").all()
-        for artist in artists:
-            data.append({
-                "id": artist.id,
-                "name": artist.name
-            })
-    except:
-        db.session.rollback()
-        error = True
-        print(sys.exc_info())
-    finally:
-        db.session.close()
-
-    # Check Error Status
-    if not error:
-        return render_template('pages/artists.html', artists=data)
-    else:
-        abort(500)
-
-#  3-Delete Artist
-#  ----------------------------------------------------------------
-
-
-@app.route('/artists/<artist_id>', methods=['DELETE'])
-def delete_artist(artist_id):
-    error = False
-    try:
-        # Get Required Artist
-        artist = Artist.query.get(artist_id)
-        artist.delete()
-        print(artist_id)
-    except():
-        db.session.rollback()
-        error = True
-    finally:
-        db.session.close()
-
-    # Check Error Status
-    if error:
-        flash('An error occurred. Artist could not be deleted.')
-        return render_template('pages/home.html')
-    else:
-        return redirect(url_for('artists'))
-
-#  4-Artists Search
-#  ----------------------------------------------------------------
-
-
-@app.route('/artists/search', methods=['POST'])
-def search_artists():
-    response = {}
-    error = False
-    try:
-        search_term = request.form.get('search_term')
-        search = f"%{search_term}%"
-        artists = Artist.query.filter(Artist.name.ilike(f"%{search}%")).all()
-        response['count'] = len(artists)
-        data = []
-
-        for artist in artists:
-            num_upcoming_shows = 0
-            shows = Show.query.filter_by(artist_id=artist.id).all()
-
-            # Calculate no. of coming shows
-            for show in shows:
-                if is_next(show.date):
-                    num_upcoming_shows += 1
-
-            data.append({
-                "id": artist.id,
-                "name": artist.name,
-                "num_upcoming_shows": num_upcoming_shows,
-            })
-        response['data'] = data
-
-    except:
-        db.session.rollback()
-        error = True
-        print(sys.exc_info())
-    finally:
-        db.session.close()
-
-    # Check Error Status
-    if not error:
-        return render_template('pages/search_artists.html', results=response, search_term=request.form.get('search_term', ''))
-    else:
-        abort(500)
-
-#  5-Artist Details
-#  ----------------------------------------------------------------
-
-
-@app.route('/artists/<int:artist_id>')
-def show_artist(artist_id):
-    artist = Artist.query.get(artist_id)
-    data = artist.format()
-    shows = Show.query.join(Artist, Show.artist_id == artist_id).all()
-    upcoming_shows_count = 0
-    past_shows_count = 0
-    upcoming_shows = []
-    past_shows = []
-    for show in shows:
-        if is_next(show.date):
-            upcoming_shows_count += 1
-            upcoming_shows.append({
-                "venue_id": show.venue_id,
-                "venue_name": show.venue.name,
-                "venue_image_link": show.venue.image_link,
-                "start_time": str(show.date)
-            })
-        else:
-            past_shows_count += 1
-            past_shows.append({
-                "venue_id": show.venue_id,
-                "venue_name": show.venue.name,
-                "venue_image_link": show.venue.image_link,
-                "start_time": str(show.date)
-            })
-    data['upcoming_shows'] = upcoming_shows
-    data['past_shows'] = past_shows
-    data['past_shows_count'] = past_shows_count
-    data['upcoming_shows_count'] = upcoming_shows_count
-    return render_template('pages/show_artist.html', artist=data)
-
-#  6-Edit Artist
-#  ----------------------------------------------------------------
-
-
-@app.route('/artists/<int:artist_id>/edit', methods=['GET'])
-def edit_artist(artist_id):
-    artist = Artist.query.get(artist_id)
-    form = ArtistForm(obj=artist)
-    return render_template('forms/edit_artist.html', form=form, artist=artist)
-
-
-@app.route('/artists/<int:artist_id>/edit', methods=['POST'])
-def edit_artist_submission(artist_id):
-    error = False
-    try:
-        artist = Artist.query.get(artist_id)
-        form = ArtistForm(request.form, obj=artist)
-        form.populate_obj(artist)
-        artist.update()
-    except:
-        db.session.rollback()
-        error = True
-        print(sys.exc_info())
-    finally:
-        db.session.close()
+#----------------------------------------------------------------------------#
+# Commands.
+#----------------------------------------------------------------------------#
 
-    # Check Error Status
-    if not error:
-        return redirect(url_for('show_artist', artist_id=artist_id))
-    else:
-        abort(500)
-
-#-------------------------------Shows---------------------------------------#
-#  1-Create Show
-#  ----------------------------------------------------------------
-
-
-@app.route('/shows/create')
-def create_shows():
-    # renders form. do not touch.
-    form = ShowForm()
-    return render_template('forms/new_show.html', form=form)
-
-
-@app.route('/shows/create', methods=['POST'])
-def create_show_submission():
-    error = False
-    try:
-        req = request.form
-        venue_id = req['venue_id']
-        artist_id = req['artist_id']
-        date = req['start_time']
-        show = Show(venue_id=venue_id, artist_id=artist_id, date=date)
-        show.insert()
-    except:
-        db.session.rollback()
-        error = True
-        print(sys.exc_info())
-    finally:
-        db.session.close()
 
-    # Check Error Status
-    if error:
-        # on unsuccessful db insert
-        flash('An error occurred. Show could not be listed.')
-        return render_template('pages/home.html')
-    else:
-        # on successful db insert, flash success
-        flash('Show was successfully listed!')
-        return render_template('pages/home.html')
-
-#  2-Read Shows
-#  ----------------------------------------------------------------
-
-
-@app.route('/shows')
-def shows():
-    error = False
-    data = []
-    try:
-        # Order all shows by Time
-        shows = Show.query.all()
-        for show in shows:
-            if is_next(show.date):
-                data.append({
-                    "venue_id": show.venue_id,
-                    "venue_name": show.venue.name,
-                    "artist_id": show.artist_id,
-                    "artist_name": show.artist.name,
-                    "artist_image_link": show.artist.image_link,
-                    "start_time": str(show.date)
-                })
-    except:
-        db.session.rollback()
-        error = True
-        print(sys.exc_info())
-    finally:
+def compile_templates(app, echo=print):
+    # Loads every .html template into the environment, and so into the
+    # bytecode cache; returns the names and how many failed
+    from jinja2 import TemplateError
+    names = app.jinja_env.list_templates(extensions=['html'])
+    failures = 0
+    for name in names:
+        try:
+            app.jinja_env.get_template(name)
+        except TemplateError as e:
+            failures += 1
+            echo(f'{name}: {e}')
+    return names, failures
+
+
+class MigrateCommands(click.Group):
+    # "flask db": Flask-Migrate, and alembic with it, load only when it runs.
+    # The real group builds the context, so its options and help apply.
+
+    def make_context(self, info_name, args, parent=None, **extra):
+        from flask.cli import ScriptInfo
+        from flask_migrate.cli import db as db_commands
+        from models import init_migrate
+        init_migrate(parent.find_object(ScriptInfo).load_app())
+        return db_commands.make_context(info_name, args, parent=parent, **extra)
+
+
+def register_commands(app):
+
+    app.cli.add_command(MigrateCommands('db', help='Perform database migrations.'))
+
+    @app.cli.command('explain')
+    def explain_routes():
+        """Print the EXPLAIN plan of every SELECT the read routes issue."""
+        from sqlalchemy import event
+        from sqlalchemy.engine import Engine
+        from models import db, Venue, Artist
+        venue = Venue.query.first()
+        artist = Artist.query.first()
         db.session.close()
 
-    # Check Error Status
-    if not error:
-        return render_template('pages/shows.html', shows=data)
-    else:
-        abort(500)
-
-
-#-------------------------------Home Page---------------------------------------#
-@app.route('/')
-def index():
-    return render_template('pages/home.html')
-
-#-------------------------------App Handling---------------------------------------#
-
-
-@app.errorhandler(404)
-def not_found_error(error):
-    return render_template('errors/404.html'), 404
-
-
-@app.errorhandler(500)
-def server_error(error):
-    return render_template('errors/500.html'), 500
-
-
-if not app.debug:
-    file_handler = FileHandler('error.log')
-    file_handler.setFormatter(
-        Formatter('%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]')
-    )
-    app.logger.setLevel(logging.INFO)
-    file_handler.setLevel(logging.INFO)
-    app.logger.addHandler(file_handler)
-    app.logger.info('errors')
+        requests = [
+            ('GET', '/venues', None),
+            ('GET', '/artists', None),
+            ('GET', '/shows', None),
+            ('POST', '/venues/search', {'search_term': 'a'}),
+            ('POST', '/artists/search', {'search_term': 'a'}),
+        ]
+        if venue is not None:
+            requests.append(('GET', f'/venues/{venue.id}', None))
+        if artist is not None:
+            requests.append(('GET', f'/artists/{artist.id}', None))
+
+        # Every route has to reach the database: no cached fragments or
+        # entities, no 304s
+        bypass = app.config.get('CACHE_BYPASS', False)
+        app.config['CACHE_BYPASS'] = True
+        client = app.test_client()
+        try:
+            for method, url, form in requests:
+                # Record the statements issued while serving the route
+                statements = []
+
+                def capture(conn, cursor, statement, parameters, context, executemany):
+                    if statement.lstrip().upper().startswith('SELECT'):
+                        statements.append((statement, parameters))
+
+                # On every engine: GETs may be served by a replica
+                event.listen(Engine, 'before_cursor_execute', capture)
+                try:
+                    client.open(url, method=method, data=form)
+                finally:
+                    event.remove(Engine, 'before_cursor_execute', capture)
+
+                click.echo(f'==> {method} {url} ({len(statements)} queries)')
+                with db.engine.connect() as connection:
+                    for statement, parameters in statements:
+                        click.echo(statement)
+                        plan = connection.exec_driver_sql('EXPLAIN ' + statement, parameters)
+                        for line in plan:
+                            click.echo('    ' + line[0])
+                        click.echo('')
+        finally:
+            app.config['CACHE_BYPASS'] = bypass
+
+    @app.cli.command('sweep-shows')
+    def sweep_shows():
+        """Roll show counters forward for shows that have started. Run periodically."""
+        from models import sweep_show_counters
+        sweep_show_counters()
+
+    @app.cli.command('import')
+    @click.argument('kind', type=click.Choice(['venues', 'artists', 'shows']))
+    @click.argument('path', type=click.Path(exists=True, dir_okay=False))
+    @click.option('--format', type=click.Choice(['csv', 'jsonl']), help='Defaults to the file extension.')
+    @click.option('--chunk-size', default=1000, show_default=True, help='Rows validated and written per batch.')
+    @click.option('--reject-file', type=click.Path(dir_okay=False), help='JSONL file receiving rejected rows and their errors.')
+    def import_data(kind, path, format, chunk_size, reject_file):
+        """Bulk-load venues, artists or shows from a CSV or JSONL file."""
+        def progress(stats):
+            click.echo('\r{read} read, {imported} imported, {rejected} rejected'.format(**stats), nl=False, err=True)
+
+        from importer import import_file
+        stats = import_file(kind, path, format, chunk_size, reject_file, progress)
+        click.echo('', err=True)
+        if stats['rejected'] and reject_file:
+            click.echo(f'Rejected rows written to {reject_file}', err=True)
+
+    @app.cli.command('export')
+    @click.argument('kind', type=click.Choice(['venues', 'artists', 'shows']))
+    @click.option('--format', type=click.Choice(['csv', 'jsonl']), default='csv', show_default=True)
+    @click.option('--output', type=click.File('w', encoding='utf-8'), default='-', help='Defaults to stdout.')
+    def export_data(kind, format, output):
+        """Stream venues, artists or shows to a CSV or JSONL file."""
+        from exporter import generate_export
+        for chunk in generate_export(kind, format):
+            output.write(chunk)
+
+    @app.cli.command('compile-templates')
+    def compile_templates_command():
+        """Compile every template into the bytecode cache and check that each one loads."""
+        if app.jinja_env.bytecode_cache is None:
+            click.echo('TEMPLATE_CACHE_DIR is not set; templates are only checked.', err=True)
+        started = time.perf_counter()
+        names, failures = compile_templates(app, echo=lambda message: click.secho(message, fg='red', err=True))
+        click.echo(f'{len(names) - failures}/{len(names)} templates compiled in {(time.perf_counter() - started) * 1000:.0f}ms')
+        if failures:
+            sys.exit(1)
+
+    @app.cli.command('serve')
+    @click.option('--bind', '-b', help='Address to listen on, SERVE_BIND by default.')
+    @click.option('--workers', '-w', type=int, help='Worker processes, 2 per CPU core + 1 by default.')
+    @click.option('--threads', type=int, help='Threads per worker, DB_POOL_SIZE by default.')
+    @click.option('--max-requests', type=int, help='Requests a worker serves before it is replaced.')
+    @click.option('--pid', 'pidfile', help='Write the master process id to this file.')
+    @click.option('--asgi', is_flag=True, help='Serve asgi.py\'s async read routes (uvicorn workers).')
+    def serve(bind, workers, threads, max_requests, pidfile, asgi):
+        """Run the app on a pre-forking server, loaded once before the workers fork."""
+        from server import Server
+        Server(app, bind=bind, workers=workers, threads=threads, max_requests=max_requests,
+               pidfile=pidfile, asgi=asgi).run()
+
+    @app.cli.command('build-assets')
+    @click.option('--vendor', is_flag=True, help='Download the third-party scripts in assets.VENDOR first.')
+    def build_assets(vendor):
+        """Fingerprint, bundle and pre-compress static/ into static/dist/."""
+        from assets import build as build_static, vendor as vendor_static
+        if vendor:
+            vendor_static(app.static_folder, echo=click.echo)
+        build_static(app.static_folder, app.static_url_path, echo=click.echo)
 
 #----------------------------------------------------------------------------#
 # Launch.
@@ -603,17 +246,11 @@ if not app.debug:
 
 # Default port:
 if __name__ == '__main__':
-    app.run()
+    create_app().run()
 
 # Or specify port manually:
 '''
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
-    app.run(host='0.0.0.0', port=port)
+    create_app().run(host='0.0.0.0', port=port)
 '''
-
-#-------------------------------Finish---------------------------------------#
-
-
-#  Update
-#  ----------------------------------------------------------------
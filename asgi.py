@@ -0,0 +1,9 @@
+#----------------------------------------------------------------------------#
+# ASGI entry point, e.g. "uvicorn asgi:app". Read routes run on the async
+# engine; everything else is the WSGI app on a thread pool (see aio.py).
+#----------------------------------------------------------------------------#
+
+from app import create_app
+from aio import ASGIApp
+
+app = ASGIApp(create_app())
@@ -0,0 +1,205 @@
+#----------------------------------------------------------------------------#
+# Imports
+#----------------------------------------------------------------------------#
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import posixpath
+import re
+import shutil
+import urllib.request
+from flask import abort, request, send_file, url_for
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+#----------------------------------------------------------------------------#
+# Static Assets.
+# "flask build-assets" copies static/ into static/dist/ under content-hashed
+# names, concatenates the bundles, rewrites url() references in CSS to the
+# hashed names and writes .gz/.br variants next to compressible files. The
+# manifest maps source paths to built ones; asset_url() falls back to the
+# plain static file when no build exists, so development needs no step.
+#----------------------------------------------------------------------------#
+
+DIST = 'dist'
+MANIFEST = 'manifest.json'
+
+BUNDLES = {
+    'css/fyyur.css': [
+        'css/bootstrap.min.css',
+        'css/layout.main.css',
+        'css/main.css',
+        'css/main.responsive.css',
+        'css/main.quickfix.css',
+    ],
+}
+
+# Third-party scripts served from static/ instead of a CDN; fetched by
+# "flask build-assets --vendor", the CDN copy is used until then
+VENDOR = {
+    'js/vendor/fontawesome-5.15.4.min.js': 'https://use.fontawesome.com/releases/v5.15.4/js/all.min.js',
+}
+
+COMPRESSIBLE = ('.css', '.js', '.map', '.svg', '.json', '.txt', '.eot', '.ttf', '.otf', '.ico')
+MIN_COMPRESS_SIZE = 512
+CSS_URL = re.compile(r"""url\(\s*(['"]?)([^'")]+)\1\s*\)""")
+
+# Served for a year and never revalidated: the name changes with the content
+MAX_AGE = 365 * 24 * 3600
+
+
+def fingerprint(path, content):
+    base, ext = posixpath.splitext(path)
+    return f'{base}.{hashlib.md5(content).hexdigest()[:12]}{ext}'
+
+
+def rewrite_css(source, content, manifest, static_url_path):
+    # Point url() references at the hashed files, relative to the built CSS
+    directory = posixpath.dirname(source)
+
+    def replace(match):
+        quote, url = match.groups()
+        if url.startswith(('data:', 'http:', 'https:', '//', '/', '#')):
+            return match.group(0)
+        path, suffix = re.match(r'([^?#]*)(.*)', url).groups()
+        target = posixpath.normpath(posixpath.join(directory, path))
+        if target in manifest:
+            url = posixpath.relpath(manifest[target], directory) + suffix
+        else:
+            # Not in static/: keep pointing where the source did
+            url = f'{static_url_path}/{target}{suffix}'
+        return f'url({quote}{url}{quote})'
+
+    return CSS_URL.sub(replace, content.decode('utf-8')).encode('utf-8')
+
+
+def compress(path):
+    with open(path, 'rb') as f:
+        content = f.read()
+    if len(content) < MIN_COMPRESS_SIZE:
+        return
+    variants = [('.gz', gzip.compress(content, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.append(('.br', brotli.compress(content, quality=11)))
+    for suffix, compressed in variants:
+        # Only keep variants that actually save bytes
+        if len(compressed) < len(content) * 0.9:
+            with open(path + suffix, 'wb') as f:
+                f.write(compressed)
+
+
+def vendor(static_folder, echo=print):
+    for path, url in VENDOR.items():
+        target = os.path.join(static_folder, path)
+        if os.path.exists(target):
+            continue
+        echo(f'Fetching {url}')
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with urllib.request.urlopen(url, timeout=30) as response, open(target, 'wb') as f:
+            shutil.copyfileobj(response, f)
+
+
+def build(static_folder, static_url_path='/static', echo=print):
+    dist = os.path.join(static_folder, DIST)
+    if os.path.isdir(dist):
+        shutil.rmtree(dist)
+
+    sources = []
+    for root, dirs, files in os.walk(static_folder):
+        dirs[:] = [d for d in dirs if os.path.join(root, d) != dist]
+        for name in files:
+            if not name.startswith('.'):
+                sources.append(posixpath.relpath(os.path.join(root, name), static_folder).replace(os.sep, '/'))
+
+    # Everything but CSS first, so stylesheets can refer to hashed names
+    sources.sort(key=lambda path: (path.endswith('.css'), path))
+    manifest = {}
+
+    def emit(path, content):
+        built = fingerprint(path, content)
+        target = os.path.join(dist, built)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, 'wb') as f:
+            f.write(content)
+        if built.endswith(COMPRESSIBLE):
+            compress(target)
+        manifest[path] = built
+
+    css = {}
+    for path in sources:
+        with open(os.path.join(static_folder, path), 'rb') as f:
+            content = f.read()
+        if path.endswith('.css'):
+            content = css[path] = rewrite_css(path, content, manifest, static_url_path)
+        emit(path, content)
+
+    for bundle, members in BUNDLES.items():
+        # Members sit next to the bundle, so their rewritten urls stay valid
+        emit(bundle, b'\n'.join(css[member] for member in members))
+
+    with open(os.path.join(dist, MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    echo(f'{len(manifest)} assets written to {dist}' + ('' if brotli else ' (install brotli for .br variants)'))
+    return manifest
+
+
+class Assets(object):
+
+    def __init__(self):
+        self.manifest = {}
+
+    def init_app(self, app):
+        self.app = app
+        self.dist = os.path.join(app.static_folder, DIST)
+        self.manifest = self.load_manifest()
+        app.add_url_rule('/assets/<path:filename>', 'assets', self.send)
+        app.jinja_env.globals['asset_url'] = self.url
+        app.jinja_env.globals['asset_urls'] = self.urls
+
+    def load_manifest(self):
+        path = os.path.join(self.dist, MANIFEST)
+        if not os.path.exists(path):
+            return {}
+        with open(path) as f:
+            return json.load(f)
+
+    def url(self, path):
+        if path in self.manifest:
+            return url_for('assets', filename=self.manifest[path])
+        if path in VENDOR and not os.path.exists(os.path.join(self.app.static_folder, path)):
+            return VENDOR[path]
+        return url_for('static', filename=path)
+
+    def urls(self, path):
+        # A bundle is one file once built, its members until then
+        if path in BUNDLES and path not in self.manifest:
+            return [self.url(member) for member in BUNDLES[path]]
+        return [self.url(path)]
+
+    def send(self, filename):
+        path = safe_join(self.dist, filename)
+        if path is None or not os.path.isfile(path):
+            abort(404)
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        encoding = None
+        for suffix, name in (('.br', 'br'), ('.gz', 'gzip')):
+            if request.accept_encodings[name] and os.path.isfile(path + suffix):
+                path, encoding = path + suffix, name
+                break
+        response = send_file(path, mimetype=mimetype, max_age=MAX_AGE)
+        if encoding:
+            response.content_encoding = encoding
+        response.vary.add('Accept-Encoding')
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
+
+
+assets = Assets()
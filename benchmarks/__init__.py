@@ -0,0 +1,11 @@
+#----------------------------------------------------------------------------#
+# Benchmarks.
+# Seed a dedicated database with synthetic venues, artists and shows, then
+# drive the routes in-process and compare latency, throughput and queries
+# per request against a stored baseline:
+#
+#   python -m benchmarks seed --venues 2000 --artists 5000 --shows 100000
+#   python -m benchmarks run --profile mixed --requests 5000
+#   python -m benchmarks formatting
+#   python -m benchmarks cold-start
+#----------------------------------------------------------------------------#
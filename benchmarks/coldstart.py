@@ -0,0 +1,60 @@
+#----------------------------------------------------------------------------#
+# Imports
+#----------------------------------------------------------------------------#
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+#----------------------------------------------------------------------------#
+# Cold Start.
+# Boots fresh interpreters the way a new worker starts: import the app
+# module, build the app and serve a first request (which compiles the
+# layout templates). No database connection is needed.
+#----------------------------------------------------------------------------#
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCRIPT = """
+import json, time
+started = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+app = create_app()
+created = time.perf_counter()
+app.test_client().get('/')
+served = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - started) * 1000,
+    'create_app_ms': (created - imported) * 1000,
+    'first_request_ms': (served - created) * 1000,
+}))
+"""
+
+STAGES = ('process_ms', 'import_ms', 'create_app_ms', 'first_request_ms')
+
+
+def boot():
+    started = time.perf_counter()
+    output = subprocess.run([sys.executable, '-c', SCRIPT], cwd=ROOT, env=os.environ.copy(),
+                            check=True, capture_output=True, text=True).stdout
+    timings = json.loads(output.strip().splitlines()[-1])
+    # Interpreter start-up and teardown included
+    timings['process_ms'] = (time.perf_counter() - started) * 1000
+    return timings
+
+
+def run(runs=5):
+    samples = [boot() for _ in range(runs)]
+    result = {stage: round(statistics.median(sample[stage] for sample in samples), 1) for stage in STAGES}
+    result['ready_ms'] = round(result['import_ms'] + result['create_app_ms'] + result['first_request_ms'], 1)
+    return result
+
+
+def format_report(result, budget):
+    lines = [f'{stage:<18}{result[stage]:>10.1f}' for stage in STAGES]
+    lines.append(f"{'ready_ms':<18}{result['ready_ms']:>10.1f}   budget {budget}ms")
+    return '\n'.join(lines)
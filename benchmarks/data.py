@@ -0,0 +1,153 @@
+#----------------------------------------------------------------------------#
+# Imports
+#----------------------------------------------------------------------------#
+
+import random
+from itertools import accumulate
+from datetime import datetime, timedelta
+from sqlalchemy import text, true
+from forms import VenueForm
+from models import db, Venue, Artist, Show, refresh_show_counters
+from cache import entity_cache, page_cache
+
+#----------------------------------------------------------------------------#
+# Synthetic Data.
+# States and genres come from the form choices; a few states and genres are
+# much more common than the rest, the way real catalogs are skewed.
+#----------------------------------------------------------------------------#
+
+STATES = [value for value, _ in VenueForm.state.kwargs['choices']]
+GENRES = [value for value, _ in VenueForm.genres.kwargs['choices']]
+
+CITIES = {
+    'CA': ['Los Angeles', 'San Francisco', 'San Diego', 'Oakland', 'Sacramento'],
+    'NY': ['New York', 'Brooklyn', 'Buffalo', 'Rochester'],
+    'TX': ['Austin', 'Houston', 'Dallas', 'San Antonio'],
+    'IL': ['Chicago', 'Springfield'],
+    'TN': ['Nashville', 'Memphis'],
+    'LA': ['New Orleans', 'Baton Rouge'],
+    'WA': ['Seattle', 'Spokane'],
+    'GA': ['Atlanta', 'Savannah'],
+    'FL': ['Miami', 'Orlando', 'Tampa'],
+    'CO': ['Denver', 'Boulder'],
+}
+
+WORDS = [
+    'Blue', 'Velvet', 'Electric', 'Golden', 'Midnight', 'Rusty', 'Silver', 'Wild', 'Neon', 'Lucky',
+    'Echo', 'Harbor', 'Canyon', 'River', 'Owl', 'Fox', 'Lantern', 'Crown', 'Anchor', 'Garden',
+]
+VENUE_SUFFIXES = ['Hall', 'Lounge', 'Club', 'Room', 'Theatre', 'Tavern', 'Ballroom', 'Stage']
+ARTIST_SUFFIXES = ['Band', 'Trio', 'Collective', 'Project', 'Quartet', 'Brothers', 'Sisters', 'Orchestra']
+
+CHUNK_SIZE = 5000
+
+
+def zipf_weights(n, s=1.1):
+    return [1.0 / (rank ** s) for rank in range(1, n + 1)]
+
+
+class Generator(object):
+
+    def __init__(self, seed=42):
+        self.random = random.Random(seed)
+        states = STATES[:]
+        self.random.shuffle(states)
+        # Put the states with well-known cities at the head of the distribution
+        self.states = list(CITIES) + [state for state in states if state not in CITIES]
+        self.state_weights = zipf_weights(len(self.states))
+        self.genres = GENRES[:]
+        self.random.shuffle(self.genres)
+        self.genre_weights = zipf_weights(len(self.genres))
+
+    def location(self):
+        state = self.random.choices(self.states, self.state_weights)[0]
+        cities = CITIES.get(state) or [f'{state} City {n}' for n in range(1, 4)]
+        return self.random.choice(cities), state
+
+    def genre_list(self):
+        count = self.random.choice((1, 1, 2, 2, 3))
+        return sorted(set(self.random.choices(self.genres, self.genre_weights, k=count)))
+
+    def name(self, suffixes):
+        return f'{self.random.choice(WORDS)} {self.random.choice(WORDS)} {self.random.choice(suffixes)}'
+
+    def phone(self):
+        return '{}-{}-{}'.format(self.random.randint(200, 999), self.random.randint(200, 999), self.random.randint(1000, 9999))
+
+    def venue(self):
+        city, state = self.location()
+        name = self.name(VENUE_SUFFIXES)
+        return {
+            'name': name,
+            'genres': self.genre_list(),
+            'address': f'{self.random.randint(1, 9999)} {self.random.choice(WORDS)} St',
+            'city': city,
+            'state': state,
+            'phone': self.phone(),
+            'website': None,
+            'facebook_link': 'https://www.facebook.com/' + name.replace(' ', '').lower(),
+            'seeking_talent': self.random.random() < 0.3,
+            'seeking_description': '',
+            'image_link': None,
+        }
+
+    def artist(self):
+        city, state = self.location()
+        name = self.name(ARTIST_SUFFIXES)
+        return {
+            'name': name,
+            'genres': self.genre_list(),
+            'city': city,
+            'state': state,
+            'phone': self.phone(),
+            'facebook_link': 'https://www.facebook.com/' + name.replace(' ', '').lower(),
+            'seeking_venue': self.random.random() < 0.3,
+            'seeking_description': '',
+            'image_link': None,
+        }
+
+    def show(self, venue_ids, venue_cum_weights, artist_ids, now):
+        # Two years of history and one year of bookings ahead, busy venues
+        # hosting far more shows than quiet ones
+        offset = self.random.uniform(-730, 365)
+        return {
+            'venue_id': self.random.choices(venue_ids, cum_weights=venue_cum_weights)[0],
+            'artist_id': self.random.choice(artist_ids),
+            'date': (now + timedelta(days=offset)).replace(second=0, microsecond=0),
+        }
+
+
+def insert_chunks(table, make_row, count):
+    for start in range(0, count, CHUNK_SIZE):
+        rows = [make_row() for _ in range(min(CHUNK_SIZE, count - start))]
+        db.session.execute(table.insert(), rows)
+        db.session.commit()
+
+
+def seed(venues=1000, artists=2000, shows=20000, seed=42, echo=print):
+    generator = Generator(seed)
+    now = datetime.now()
+
+    echo('Truncating venue, artist and show')
+    db.session.execute(text('TRUNCATE show, venue, artist RESTART IDENTITY'))
+    db.session.commit()
+
+    echo(f'Inserting {venues} venues')
+    insert_chunks(Venue.__table__, generator.venue, venues)
+    echo(f'Inserting {artists} artists')
+    insert_chunks(Artist.__table__, generator.artist, artists)
+
+    venue_ids = [id for id, in db.session.query(Venue.id)]
+    artist_ids = [id for id, in db.session.query(Artist.id)]
+    venue_cum_weights = list(accumulate(zipf_weights(len(venue_ids), 0.8)))
+    echo(f'Inserting {shows} shows')
+    insert_chunks(Show.__table__, lambda: generator.show(venue_ids, venue_cum_weights, artist_ids, now), shows)
+
+    echo('Refreshing show counters')
+    refresh_show_counters(Venue, true())
+    refresh_show_counters(Artist, true())
+    db.session.commit()
+    db.session.execute(text('ANALYZE'))
+    db.session.commit()
+    entity_cache.clear()
+    page_cache.invalidate('venues', 'artists', 'shows')
@@ -0,0 +1,71 @@
+#----------------------------------------------------------------------------#
+# Imports
+#----------------------------------------------------------------------------#
+
+import random
+import timeit
+from datetime import datetime, timedelta
+import babel.dates
+import dateutil.parser
+from formatting import DateFormatter
+
+#----------------------------------------------------------------------------#
+# Date Formatting Micro-benchmark.
+# Formats one page worth of show dates the way the old filter did (str ->
+# dateutil -> babel.dates.format_datetime) and with DateFormatter, cold
+# (unique dates) and warm (dates seen before).
+#----------------------------------------------------------------------------#
+
+
+def legacy_format(value, format='medium'):
+    date = dateutil.parser.parse(value)
+    if format == 'full':
+        format = "EEEE MMMM, d, y 'at' h:mma"
+    elif format == 'medium':
+        format = "EE MM, dd, y h:mma"
+    return babel.dates.format_datetime(date, format)
+
+
+def show_dates(count, seed=42):
+    rng = random.Random(seed)
+    now = datetime.now().replace(second=0, microsecond=0)
+    return [now + timedelta(minutes=rng.randint(-500000, 500000)) for _ in range(count)]
+
+
+def run(shows=500, repeat=20, seed=42):
+    dates = show_dates(shows, seed)
+    strings = [str(date) for date in dates]
+    formatter = DateFormatter()
+
+    def cold():
+        formatter.format.cache_clear()
+        for date in dates:
+            formatter.format(date, 'full')
+
+    def warm():
+        for date in dates:
+            formatter.format(date, 'full')
+
+    cases = [
+        ('legacy filter', lambda: [legacy_format(value, 'full') for value in strings]),
+        ('filter, cold', cold),
+        ('filter, warm', warm),
+        ('format_many', lambda: formatter.format_many(dates, 'full')),
+    ]
+    # Same output before timing anything
+    assert [legacy_format(value, 'full') for value in strings] == formatter.format_many(dates, 'full')
+
+    results = []
+    for name, case in cases:
+        case()
+        best = min(timeit.repeat(case, number=1, repeat=repeat))
+        results.append((name, best * 1e6 / shows))
+    return results
+
+
+def format_report(results):
+    baseline = results[0][1]
+    lines = [f"{'case':<16}{'us/show':>10}{'speedup':>10}"]
+    for name, per_show in results:
+        lines.append(f"{name:<16}{per_show:>10.2f}{baseline / per_show:>9.1f}x")
+    return '\n'.join(lines)
@@ -0,0 +1,254 @@
+#----------------------------------------------------------------------------#
+# Imports
+#----------------------------------------------------------------------------#
+
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from models import db, Venue, Artist
+from benchmarks.data import Generator
+
+#----------------------------------------------------------------------------#
+# Load Profiles.
+# Each scenario builds one request against the app; a profile weights the
+# scenarios the way traffic mixes them.
+#----------------------------------------------------------------------------#
+
+PROFILES = {
+    'mixed': {
+        'venues': 10, 'artists': 10, 'shows': 12, 'shows_page': 4,
+        'search_venues': 8, 'search_artists': 8, 'show_venue': 15, 'show_artist': 15,
+        'edit_venue_form': 2, 'edit_venue': 2, 'edit_artist': 2,
+        'create_venue': 1, 'create_artist': 1, 'create_show': 2,
+    },
+    'read': {
+        'venues': 15, 'artists': 15, 'shows': 15, 'shows_page': 5,
+        'search_venues': 10, 'search_artists': 10, 'show_venue': 15, 'show_artist': 15,
+    },
+    'write': {
+        'edit_venue': 20, 'edit_artist': 20, 'create_venue': 15, 'create_artist': 15, 'create_show': 30,
+    },
+}
+
+SEARCH_TERMS = ['blue', 'hall', 'fox', 'river band', 'electric', 'lounge', 'neon', 'crown', 'a', 'the']
+
+
+def form_data(values):
+    # Render model values the way the browser would post them
+    data = []
+    for key, value in values.items():
+        if value is None:
+            continue
+        if isinstance(value, list):
+            data.extend((key, v) for v in value)
+        elif isinstance(value, bool):
+            if value:
+                data.append((key, 'y'))
+        else:
+            data.append((key, str(value)))
+    return data
+
+
+class Scenarios(object):
+
+    def __init__(self, seed):
+        self.random = random.Random(seed)
+        self.generator = Generator(seed)
+        self.venue_ids = [id for id, in db.session.query(Venue.id)]
+        self.artist_ids = [id for id, in db.session.query(Artist.id)]
+        db.session.close()
+        if not self.venue_ids or not self.artist_ids:
+            raise RuntimeError('The benchmark database is empty; run "python -m benchmarks seed" first')
+        self.lock = threading.Lock()
+
+    def build(self, name):
+        with self.lock:
+            return getattr(self, name)()
+
+    def venues(self):
+        return 'GET', '/venues', None
+
+    def artists(self):
+        return 'GET', '/artists', None
+
+    def shows(self):
+        return 'GET', '/shows', None
+
+    def shows_page(self):
+        start = datetime.now() + timedelta(days=self.random.randint(0, 300))
+        cursor = f'{start.isoformat()}_0'
+        return 'GET', f'/shows?cursor={cursor}', None
+
+    def search_venues(self):
+        return 'POST', '/venues/search', {'search_term': self.random.choice(SEARCH_TERMS)}
+
+    def search_artists(self):
+        return 'POST', '/artists/search', {'search_term': self.random.choice(SEARCH_TERMS)}
+
+    def show_venue(self):
+        return 'GET', f'/venues/{self.random.choice(self.venue_ids)}', None
+
+    def show_artist(self):
+        return 'GET', f'/artists/{self.random.choice(self.artist_ids)}', None
+
+    def edit_venue_form(self):
+        return 'GET', f'/venues/{self.random.choice(self.venue_ids)}/edit', None
+
+    def edit_venue(self):
+        return 'POST', f'/venues/{self.random.choice(self.venue_ids)}/edit', form_data(self.generator.venue())
+
+    def edit_artist(self):
+        return 'POST', f'/artists/{self.random.choice(self.artist_ids)}/edit', form_data(self.generator.artist())
+
+    def create_venue(self):
+        return 'POST', '/venues/create', form_data(self.generator.venue())
+
+    def create_artist(self):
+        return 'POST', '/artists/create', form_data(self.generator.artist())
+
+    def create_show(self):
+        show = self.generator.show(self.venue_ids, None, self.artist_ids, datetime.now())
+        return 'POST', '/shows/create', {
+            'venue_id': show['venue_id'],
+            'artist_id': show['artist_id'],
+            'start_time': show['date'].strftime('%Y-%m-%d %H:%M:%S'),
+        }
+
+#----------------------------------------------------------------------------#
+# Runner.
+#----------------------------------------------------------------------------#
+
+
+class QueryCounter(object):
+    # Counts the statements issued on the current thread
+
+    def __init__(self):
+        self.local = threading.local()
+
+    def __enter__(self):
+        event.listen(Engine, 'after_cursor_execute', self.count)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(Engine, 'after_cursor_execute', self.count)
+
+    def count(self, *args):
+        self.local.count = getattr(self.local, 'count', 0) + 1
+
+    def reset(self):
+        self.local.count = 0
+
+    def value(self):
+        return getattr(self.local, 'count', 0)
+
+
+def run(app, profile='mixed', requests=2000, concurrency=8, warmup=100, seed=42):
+    weights = PROFILES[profile]
+    names = list(weights)
+    chooser = random.Random(seed)
+    plan = chooser.choices(names, [weights[name] for name in names], k=warmup + requests)
+
+    with app.app_context():
+        scenarios = Scenarios(seed)
+
+    samples = {name: [] for name in names}
+    errors = {name: 0 for name in names}
+    record_lock = threading.Lock()
+    local = threading.local()
+
+    with QueryCounter() as counter:
+
+        def execute(index, name):
+            client = getattr(local, 'client', None)
+            if client is None:
+                client = local.client = app.test_client()
+            method, url, data = scenarios.build(name)
+            counter.reset()
+            start = time.perf_counter()
+            response = client.open(url, method=method, data=data)
+            response.get_data()
+            elapsed = time.perf_counter() - start
+            if index < warmup:
+                return
+            with record_lock:
+                if response.status_code >= 400:
+                    errors[name] += 1
+                samples[name].append((elapsed, counter.value()))
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for future in [pool.submit(execute, index, name) for index, name in enumerate(plan)]:
+                future.result()
+        wall = time.perf_counter() - started
+
+    return summarize(samples, errors, wall, requests)
+
+#----------------------------------------------------------------------------#
+# Reporting.
+#----------------------------------------------------------------------------#
+
+
+def percentile(values, fraction):
+    # Nearest-rank percentile of a sorted list
+    if not values:
+        return 0.0
+    index = max(int(round(fraction * len(values) + 0.5)) - 1, 0)
+    return values[min(index, len(values) - 1)]
+
+
+def summarize(samples, errors, wall, requests):
+    scenarios = {}
+    for name, values in samples.items():
+        if not values:
+            continue
+        latencies = sorted(elapsed for elapsed, _ in values)
+        scenarios[name] = {
+            'requests': len(values),
+            'errors': errors[name],
+            'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+            'p95_ms': round(percentile(latencies, 0.95) * 1000, 2),
+            'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+            'queries_per_request': round(sum(queries for _, queries in values) / float(len(values)), 2),
+        }
+    return {
+        'requests': requests,
+        'seconds': round(wall, 2),
+        # Wall time includes the warm-up requests, so throughput is conservative
+        'throughput_rps': round(requests / wall, 1) if wall else 0.0,
+        'scenarios': scenarios,
+    }
+
+
+def compare(result, baseline, tolerance=0.2):
+    # Regressions against a stored baseline: slower p95, more queries, new errors
+    failures = []
+    for name, current in result['scenarios'].items():
+        previous = baseline.get('scenarios', {}).get(name)
+        if previous is None:
+            continue
+        if current['p95_ms'] > previous['p95_ms'] * (1 + tolerance):
+            failures.append(f"{name}: p95 {current['p95_ms']}ms > baseline {previous['p95_ms']}ms (+{int(tolerance * 100)}%)")
+        if current['queries_per_request'] > previous['queries_per_request'] + 0.5:
+            failures.append(f"{name}: {current['queries_per_request']} queries/request > baseline {previous['queries_per_request']}")
+        if current['errors'] > previous['errors']:
+            failures.append(f"{name}: {current['errors']} errors > baseline {previous['errors']}")
+    if result['throughput_rps'] < baseline.get('throughput_rps', 0) * (1 - tolerance):
+        failures.append(f"throughput {result['throughput_rps']} rps < baseline {baseline['throughput_rps']} rps (-{int(tolerance * 100)}%)")
+    return failures
+
+
+def format_report(result):
+    lines = [
+        f"{'scenario':<18}{'reqs':>7}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'queries':>10}",
+    ]
+    for name, stats in sorted(result['scenarios'].items()):
+        lines.append(
+            f"{name:<18}{stats['requests']:>7}{stats['errors']:>8}{stats['p50_ms']:>10}"
+            f"{stats['p95_ms']:>10}{stats['p99_ms']:>10}{stats['queries_per_request']:>10}"
+        )
+    lines.append(f"{result['requests']} requests in {result['seconds']}s: {result['throughput_rps']} req/s")
+    return '\n'.join(lines)
@@ -0,0 +1,61 @@
+#----------------------------------------------------------------------------#
+# Imports
+#----------------------------------------------------------------------------#
+
+from flask import g, request
+from metrics import metrics
+
+#----------------------------------------------------------------------------#
+# Query Budgets.
+# Each endpoint may declare the most SQL statements one request is allowed
+# to issue, with @query_budget(n) or the QUERY_BUDGETS config map. Requests
+# are counted by the engine events in metrics.py.
+#----------------------------------------------------------------------------#
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def query_budget(max_queries):
+    def decorator(f):
+        f.query_budget = max_queries
+        return f
+    return decorator
+
+
+class QueryBudgets(object):
+
+    def __init__(self):
+        self.violations = metrics.counter(
+            'fyyur_query_budget_violations_total', 'Requests that issued more SQL statements than their budget.',
+            ('endpoint',))
+
+    def init_app(self, app):
+        self.app = app
+        self.budgets = app.config.get('QUERY_BUDGETS', {})
+        # 'raise' fails the request, 'log' warns, 'count' only reports to /metrics
+        self.mode = app.config.get('QUERY_BUDGET_MODE') or (
+            'raise' if app.testing else 'log' if app.debug else 'count')
+        app.after_request(self.check)
+
+    def budget_for(self, endpoint):
+        view = self.app.view_functions.get(endpoint)
+        budget = getattr(view, 'query_budget', None)
+        return self.budgets.get(endpoint, budget)
+
+    def check(self, response):
+        budget = self.budget_for(request.endpoint)
+        if budget is None or 'query_count' not in g or g.query_count <= budget:
+            return response
+
+        self.violations.inc(endpoint=request.endpoint)
+        message = f'{request.method} {request.path} ({request.endpoint}) issued {g.query_count} SQL statements, budget is {budget}'
+        if self.mode == 'raise':
+            raise QueryBudgetExceeded(message)
+        if self.mode == 'log':
+            self.app.logger.warning(message)
+        return response
+
+
+query_budgets = QueryBudgets()
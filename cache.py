@@ -0,0 +1,404 @@
+#----------------------------------------------------------------------------#
+# Imports
+#----------------------------------------------------------------------------#
+
+import asyncio
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from urllib.parse import urlencode
+from flask import current_app, has_app_context, request
+from replicas import replica_router
+
+#----------------------------------------------------------------------------#
+# Cache Backends.
+#----------------------------------------------------------------------------#
+
+
+class LRUCache(object):
+    # In-process cache bounded by entry count, each entry expiring after its TTL
+
+    def __init__(self, max_entries=1024, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires <= time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self.lock:
+            self.entries[key] = (value, expires)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def add(self, key, value, ttl=None):
+        # Set only if absent; True when this call stored the value
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[1] > time.monotonic():
+                return False
+            self.entries[key] = (value, time.monotonic() + (self.ttl if ttl is None else ttl))
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+            return True
+
+    def delete(self, *keys):
+        with self.lock:
+            for key in keys:
+                self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+class RedisCache(object):
+    # Cache shared by every worker, served by Redis or any server speaking its protocol
+
+    def __init__(self, url, ttl=300, prefix='fyyur:'):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("CACHE_BACKEND = 'redis' requires the redis package")
+        self.errors = (redis.RedisError,)
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, key):
+        try:
+            value = self.client.get(self.prefix + key)
+        except self.errors:
+            # An unreachable cache is a miss, never a failed page
+            return None
+        return None if value is None else pickle.loads(value)
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        try:
+            self.client.set(self.prefix + key, pickle.dumps(value), px=max(int(ttl * 1000), 1))
+        except self.errors:
+            pass
+
+    def add(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        try:
+            return bool(self.client.set(self.prefix + key, pickle.dumps(value), px=max(int(ttl * 1000), 1), nx=True))
+        except self.errors:
+            return True
+
+    def delete(self, *keys):
+        if not keys:
+            return
+        try:
+            self.client.delete(*[self.prefix + key for key in keys])
+        except self.errors:
+            pass
+
+    def clear(self):
+        try:
+            keys = list(self.client.scan_iter(self.prefix + '*'))
+            if keys:
+                self.client.delete(*keys)
+        except self.errors:
+            pass
+
+
+def make_backend(app, ttl, max_entries):
+    backend = app.config.get('CACHE_BACKEND', 'memory')
+    if backend == 'redis':
+        return RedisCache(app.config['CACHE_REDIS_URL'], ttl=ttl)
+    if backend == 'memory':
+        return LRUCache(max_entries, ttl=ttl)
+    raise ValueError(f'Unknown CACHE_BACKEND: {backend}')
+
+
+def bypassed():
+    # CACHE_BYPASS serves every request from the database ("flask explain")
+    return has_app_context() and current_app.config.get('CACHE_BYPASS', False)
+
+
+# Entity versions and page generations: a random token, and when the write
+# that replaced it happened (0 when none has been seen)
+Version = namedtuple('Version', 'token written_at')
+
+
+def new_version(written_at=0):
+    return Version(os.urandom(8).hex(), written_at)
+
+
+def read_version(backend, key):
+    version = backend.get(key)
+    if not isinstance(version, Version):
+        version = new_version()
+        if not backend.add(key, version, 86400):
+            version = backend.get(key) or version
+    return version
+
+
+async def read_version_async(backend, key):
+    version = await call_async(backend, 'get', key)
+    if not isinstance(version, Version):
+        version = new_version()
+        if not await call_async(backend, 'add', key, version, 86400):
+            version = await call_async(backend, 'get', key) or version
+    return version
+
+
+def fill_source(*versions):
+    # Cache fills are served to every user. A replica may answer them once
+    # it has surely replayed the writes behind the versions; until then the
+    # primary does (see ReplicaRouter.reads_after)
+    return replica_router.reads_after(max([version.written_at for version in versions if version], default=0))
+
+
+async def call_async(backend, method, *args):
+    # For coroutines (aio.py): Redis calls are network round trips and run on
+    # the loop's thread pool, so they never stall the other requests on the
+    # loop; the in-process LRU answers in microseconds and is called directly
+    function = getattr(backend, method)
+    if isinstance(backend, LRUCache):
+        return function(*args)
+    return await asyncio.get_running_loop().run_in_executor(None, function, *args)
+
+
+#----------------------------------------------------------------------------#
+# Entity Cache.
+# Holds the Venue.format() / Artist.format() dicts and the show lists of
+# the detail pages; the models invalidate it on every write. Each key has a
+# version token, read before loading and replaced by the invalidation: a
+# value loaded before a write but stored after it lands under the old token
+# and is never read.
+#----------------------------------------------------------------------------#
+
+
+class EntityCache(object):
+
+    def __init__(self):
+        self.ttl = 300
+        self.backend = LRUCache(ttl=self.ttl)
+
+    def init_app(self, app):
+        self.ttl = app.config.get('CACHE_TTL', 300)
+        self.backend = make_backend(app, self.ttl, app.config.get('CACHE_MAX_ENTRIES', 1024))
+
+    def version(self, key):
+        return read_version(self.backend, 'version:' + key)
+
+    def lookup(self, key):
+        # The cached value (None on a miss) and the version to fill it under
+        if bypassed():
+            return None, None
+        version = self.version(key)
+        return self.backend.get(f'{key}@{version.token}'), version
+
+    def fill(self, key, version, value, ttl=None):
+        if version is None:
+            return
+        # A caller-supplied TTL can only shorten the configured one
+        self.backend.set(f'{key}@{version.token}', value, self.ttl if ttl is None else min(ttl, self.ttl))
+
+    def get(self, key):
+        return self.lookup(key)[0]
+
+    def delete(self, *keys):
+        for key in keys:
+            self.backend.set('version:' + key, new_version(time.time()), 86400)
+
+    def clear(self):
+        self.backend.clear()
+
+    def get_or_load(self, key, loader, ttl=None):
+        value, version = self.lookup(key)
+        if value is None:
+            with fill_source(version):
+                value = loader()
+            # Missing rows are not cached
+            if value is not None:
+                self.fill(key, version, value, ttl)
+        return value
+
+    async def version_async(self, key):
+        return await read_version_async(self.backend, 'version:' + key)
+
+    async def lookup_async(self, key):
+        if bypassed():
+            return None, None
+        version = await self.version_async(key)
+        return await call_async(self.backend, 'get', f'{key}@{version.token}'), version
+
+    async def fill_async(self, key, version, value, ttl=None):
+        if version is None:
+            return
+        await call_async(self.backend, 'set', f'{key}@{version.token}', value, self.ttl if ttl is None else min(ttl, self.ttl))
+
+    async def get_or_load_async(self, key, loader, ttl=None):
+        # loader is a coroutine function (see aio.py)
+        value, version = await self.lookup_async(key)
+        if value is None:
+            with fill_source(version):
+                value = await loader()
+            if value is not None:
+                await self.fill_async(key, version, value, ttl)
+        return value
+
+
+def cache_key(kind, id):
+    return f'{kind}:{id}'
+
+
+entity_cache = EntityCache()
+
+#----------------------------------------------------------------------------#
+# Page Cache.
+# Holds the rendered listing fragments of /venues, /artists and /shows, keyed
+# by tag, path and query string. Each tag has a generation token that the
+# models replace on every write, which orphans all of the tag's fragments at
+# once; concurrent misses on one key wait for a single render.
+#----------------------------------------------------------------------------#
+
+
+class PageCache(object):
+
+    def __init__(self):
+        self.ttl = 60
+        self.lock_timeout = 5
+        self.backend = LRUCache(256, ttl=self.ttl)
+        self.lock = threading.Lock()
+        self.flights = {}
+        self.async_flights = {}
+
+    def init_app(self, app):
+        self.ttl = app.config.get('PAGE_CACHE_TTL', 60)
+        self.lock_timeout = app.config.get('PAGE_CACHE_LOCK_TIMEOUT', 5)
+        self.backend = make_backend(app, self.ttl, app.config.get('PAGE_CACHE_MAX_ENTRIES', 256))
+
+    def generation(self, tag):
+        return read_version(self.backend, f'page_generation:{tag}')
+
+    def invalidate(self, *tags):
+        for tag in tags:
+            self.backend.set(f'page_generation:{tag}', new_version(time.time()), 86400)
+
+    def key(self, tag, generation):
+        query = urlencode(sorted(request.args.items(multi=True)))
+        return f'page:{tag}:{generation.token}:{request.path}?{query}'
+
+    def get_or_render(self, tag, render):
+        # render() returns the fragment and how long it stays valid (None for PAGE_CACHE_TTL)
+        if bypassed():
+            return render()[0]
+        generation = self.generation(tag)
+        key = self.key(tag, generation)
+        value = self.backend.get(key)
+        if value is not None:
+            return value
+
+        with self.lock:
+            flight = self.flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self.flights[key] = threading.Event()
+        if not leader:
+            # Another thread of this worker is rendering the same key
+            flight.wait(self.lock_timeout)
+            value = self.backend.get(key)
+            return value if value is not None else self.store(key, render, generation)
+        try:
+            return self.render_once(key, render, generation)
+        finally:
+            with self.lock:
+                del self.flights[key]
+            flight.set()
+
+    def render_once(self, key, render, generation):
+        # Across workers sharing Redis: the one holding the lock renders, the
+        # others poll for its result until the lock would have expired
+        lock = 'lock:' + key
+        if self.backend.add(lock, 1, self.lock_timeout):
+            try:
+                return self.store(key, render, generation)
+            finally:
+                self.backend.delete(lock)
+        deadline = time.monotonic() + self.lock_timeout
+        while time.monotonic() < deadline:
+            time.sleep(0.05)
+            value = self.backend.get(key)
+            if value is not None:
+                return value
+        return self.store(key, render, generation)
+
+    def store(self, key, render, generation):
+        with fill_source(generation):
+            value, ttl = render()
+        self.backend.set(key, value, self.ttl if ttl is None else min(ttl, self.ttl))
+        return value
+
+    async def generation_async(self, tag):
+        return await read_version_async(self.backend, f'page_generation:{tag}')
+
+    async def get_or_render_async(self, tag, render):
+        # As get_or_render(), for coroutine renders; requests waiting on the
+        # same key share one event loop, so no thread lock is needed
+        if bypassed():
+            return (await render())[0]
+        generation = await self.generation_async(tag)
+        key = self.key(tag, generation)
+        value = await call_async(self.backend, 'get', key)
+        if value is not None:
+            return value
+
+        flight = self.async_flights.get(key)
+        if flight is not None:
+            try:
+                await asyncio.wait_for(flight.wait(), self.lock_timeout)
+            except asyncio.TimeoutError:
+                pass
+            value = await call_async(self.backend, 'get', key)
+            return value if value is not None else await self.store_async(key, render, generation)
+        flight = self.async_flights[key] = asyncio.Event()
+        try:
+            return await self.render_once_async(key, render, generation)
+        finally:
+            del self.async_flights[key]
+            flight.set()
+
+    async def render_once_async(self, key, render, generation):
+        lock = 'lock:' + key
+        if await call_async(self.backend, 'add', lock, 1, self.lock_timeout):
+            try:
+                return await self.store_async(key, render, generation)
+            finally:
+                await call_async(self.backend, 'delete', lock)
+        deadline = time.monotonic() + self.lock_timeout
+        while time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+            value = await call_async(self.backend, 'get', key)
+            if value is not None:
+                return value
+        return await self.store_async(key, render, generation)
+
+    async def store_async(self, key, render, generation):
+        with fill_source(generation):
+            value, ttl = await render()
+        await call_async(self.backend, 'set', key, value, self.ttl if ttl is None else min(ttl, self.ttl))
+        return value
+
+
+page_cache = PageCache()
@@ -0,0 +1,104 @@
+#----------------------------------------------------------------------------#
+# Imports
+#----------------------------------------------------------------------------#
+
+import gzip
+import re
+import time
+from flask import request
+from jinja2.ext import Extension
+from metrics import metrics
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+#----------------------------------------------------------------------------#
+# Response Compression.
+# Text responses over COMPRESS_MIN_SIZE are gzip- or brotli-encoded when the
+# client accepts it. Streamed responses (exports) and responses that are
+# already encoded (pre-compressed /assets/) pass through untouched.
+#----------------------------------------------------------------------------#
+
+RATIO_BUCKETS = (0.05, 0.1, 0.15, 0.2, 0.3, 0.4, 0.5, 0.7, 0.9, 1.0)
+CPU_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1)
+
+COMPRESS_MIMETYPES = (
+    'text/html', 'text/css', 'text/plain', 'text/csv', 'text/javascript',
+    'application/javascript', 'application/json', 'application/x-ndjson', 'image/svg+xml',
+)
+
+
+class StripWhitespace(Extension):
+    # Drops indentation and blank lines from .html templates when they are
+    # compiled, so rendering pays nothing for it. Pages with <pre> or
+    # <textarea> are left alone.
+
+    def preprocess(self, source, name, filename=None):
+        if not (name or '').endswith('.html') or re.search(r'<(pre|textarea)\b', source):
+            return source
+        return re.sub(r'\n\s+', '\n', source)
+
+
+class Compression(object):
+
+    def __init__(self):
+        self.ratio = metrics.histogram(
+            'fyyur_compression_ratio', 'Compressed over uncompressed response size.', ('encoding',), RATIO_BUCKETS)
+        self.cpu = metrics.histogram(
+            'fyyur_compression_cpu_seconds', 'CPU time spent compressing one response.', ('encoding',), CPU_BUCKETS)
+        self.bytes = metrics.counter(
+            'fyyur_compression_bytes_total', 'Response bytes before and after compression.', ('encoding', 'stage'))
+
+    def init_app(self, app):
+        self.min_size = app.config.get('COMPRESS_MIN_SIZE', 1024)
+        self.gzip_level = app.config.get('COMPRESS_GZIP_LEVEL', 6)
+        self.brotli_quality = app.config.get('COMPRESS_BROTLI_QUALITY', 4)
+        self.encodings = [encoding for encoding in app.config.get('COMPRESS_ENCODINGS', ('br', 'gzip'))
+                          if encoding == 'gzip' or (encoding == 'br' and brotli is not None)]
+        if app.config.get('COMPRESS_STRIP_WHITESPACE'):
+            app.jinja_env.add_extension(StripWhitespace)
+            app.jinja_env.trim_blocks = True
+            app.jinja_env.lstrip_blocks = True
+        app.after_request(self.compress)
+
+    def choose(self):
+        for encoding in self.encodings:
+            if request.accept_encodings[encoding]:
+                return encoding
+        return None
+
+    def compress(self, response):
+        if response.direct_passthrough or response.is_streamed or 'Content-Encoding' in response.headers:
+            return response
+        if response.status_code < 200 or response.status_code in (204, 304) \
+                or response.mimetype not in COMPRESS_MIMETYPES:
+            return response
+        # Whether or not this client gets it compressed, caches must key on it
+        response.vary.add('Accept-Encoding')
+        encoding = self.choose()
+        data = response.get_data()
+        if encoding is None or len(data) < self.min_size:
+            return response
+
+        started = time.thread_time()
+        if encoding == 'br':
+            compressed = brotli.compress(data, quality=self.brotli_quality)
+        else:
+            compressed = gzip.compress(data, compresslevel=self.gzip_level)
+        self.cpu.observe(time.thread_time() - started, encoding=encoding)
+        self.ratio.observe(len(compressed) / float(len(data)), encoding=encoding)
+        self.bytes.inc(len(data), encoding=encoding, stage='uncompressed')
+        self.bytes.inc(len(compressed), encoding=encoding, stage='compressed')
+
+        response.set_data(compressed)
+        response.content_encoding = encoding
+        # Each encoding is a different representation; weak tags still validate
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
+
+
+compression = Compression()
@@ -0,0 +1,101 @@
+#----------------------------------------------------------------------------#
+# Imports
+#----------------------------------------------------------------------------#
+
+import hashlib
+import inspect
+from datetime import datetime, timedelta, timezone
+from functools import wraps
+from flask import Response, current_app, make_response, request
+
+#----------------------------------------------------------------------------#
+# Conditional GET.
+# A validator answers, with one cheap query, when the page last changed and
+# a version string covering what timestamps cannot (rows deleted since).
+# Clients and caches holding a current copy get a 304 before the view runs
+# its queries or renders a template.
+#----------------------------------------------------------------------------#
+
+
+def utc(value):
+    # Naive values are show dates in the app's local time
+    if value.tzinfo is None:
+        value = value.astimezone()
+    return value.astimezone(timezone.utc)
+
+
+def latest(*values):
+    values = [utc(value) for value in values if value is not None]
+    return max(values) if values else None
+
+
+def make_etag(last_modified, version):
+    # Bumping ETAG_VERSION on deploy invalidates copies rendered by old templates
+    key = f"{request.full_path}:{last_modified.isoformat()}:{version}:{current_app.config.get('ETAG_VERSION', '')}"
+    return hashlib.md5(key.encode('utf-8')).hexdigest()
+
+
+def is_fresh(etag, last_modified):
+    if request.if_none_match:
+        # Weak comparison: compressed responses carry a weak tag
+        return request.if_none_match.contains_weak(etag)
+    if request.if_modified_since is not None:
+        # HTTP dates carry whole seconds
+        return last_modified.replace(microsecond=0) <= request.if_modified_since
+    return False
+
+
+def check(validators):
+    # The ETag and Last-Modified to answer with, or None to let the view run
+    # untagged
+    if validators is None or validators[0] is None:
+        return None
+    last_modified, version = validators
+    # Per-worker caches may still hold the previous copy of a page
+    # changed moments ago; it must not be tagged with the new validators
+    settle = current_app.config.get('ETAG_MIN_AGE', 0)
+    if settle and last_modified > datetime.now(timezone.utc) - timedelta(seconds=settle):
+        return None
+    return make_etag(last_modified, version), last_modified
+
+
+def tag(response, etag, last_modified):
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    # Shared caches may store the page but must revalidate each use
+    response.cache_control.no_cache = True
+    return response
+
+
+def conditional(validator):
+    # validator(**view_args) returns (last_modified, version), or None to
+    # let the view answer (e.g. with a 404). Coroutine views (aio.py) take
+    # a coroutine validator.
+    def decorator(f):
+        if inspect.iscoroutinefunction(f):
+            @wraps(f)
+            async def async_wrapper(*args, **kwargs):
+                if request.method not in ('GET', 'HEAD') or current_app.config.get('CACHE_BYPASS'):
+                    return await f(*args, **kwargs)
+                tags = check(await validator(**kwargs))
+                if tags is None:
+                    return await f(*args, **kwargs)
+                if is_fresh(*tags):
+                    return tag(Response(status=304), *tags)
+                response = make_response(await f(*args, **kwargs))
+                return tag(response, *tags) if response.status_code == 200 else response
+            return async_wrapper
+
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            if request.method not in ('GET', 'HEAD') or current_app.config.get('CACHE_BYPASS'):
+                return f(*args, **kwargs)
+            tags = check(validator(**kwargs))
+            if tags is None:
+                return f(*args, **kwargs)
+            if is_fresh(*tags):
+                return tag(Response(status=304), *tags)
+            response = make_response(f(*args, **kwargs))
+            return tag(response, *tags) if response.status_code == 200 else response
+        return wrapper
+    return decorator
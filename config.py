@@ -1,15 +1,152 @@
 import os
-SECRET_KEY = os.urandom(32)
+# Set it in production: every worker and server must sign sessions alike
+SECRET_KEY = os.environ.get('SECRET_KEY') or os.urandom(32)
 # Grabs the folder where the script runs.
 basedir = os.path.abspath(os.path.dirname(__file__))
 
-# Enable debug mode.
-DEBUG = True
+# Enable debug mode with FLASK_DEBUG=1 (or FLASK_ENV=development); never
+# in production
+DEBUG = os.environ.get('FLASK_DEBUG', '').lower() in ('1', 'true', 'yes') \
+    or os.environ.get('FLASK_ENV') == 'development'
 
 # Connect to the database
 database_name = "fyyur"
 
-# TODO IMPLEMENT DATABASE URL
-SQLALCHEMY_DATABASE_URI = "postgresql://{}:{}@{}/{}".format('postgres', 'postgres', 'localhost:5432', database_name)
+SQLALCHEMY_DATABASE_URI = os.environ.get(
+    'DATABASE_URL',
+    "postgresql://{}:{}@{}/{}".format('postgres', 'postgres', 'localhost:5432', database_name)
+)
 
 SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+# Entity cache: 'memory' (per-process LRU, other workers see writes after
+# CACHE_TTL) or 'redis' (shared by all workers, invalidated immediately)
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'memory')
+CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+CACHE_TTL = int(os.environ.get('CACHE_TTL', 300))
+CACHE_MAX_ENTRIES = int(os.environ.get('CACHE_MAX_ENTRIES', 1024))
+
+# Rendered /venues, /artists and /shows fragments, on the same backend;
+# model writes invalidate them, the TTL bounds staleness across workers
+# on the 'memory' backend
+PAGE_CACHE_TTL = int(os.environ.get('PAGE_CACHE_TTL', 60))
+PAGE_CACHE_MAX_ENTRIES = int(os.environ.get('PAGE_CACHE_MAX_ENTRIES', 256))
+# How long concurrent misses wait for the one render in flight
+PAGE_CACHE_LOCK_TIMEOUT = 5
+
+# Serve every request from the database: no entity or page cache, no 304s.
+# "flask explain" turns it on while it replays the routes.
+CACHE_BYPASS = False
+
+# Conditional GET. Pages changed less than ETAG_MIN_AGE seconds ago are sent
+# without validators, since per-process caches may not have caught up yet.
+# Bump ETAG_VERSION when templates change so clients drop their old copies.
+ETAG_MIN_AGE = 0 if CACHE_BACKEND == 'redis' else max(CACHE_TTL, PAGE_CACHE_TTL)
+ETAG_VERSION = os.environ.get('ETAG_VERSION', '')
+
+# Slow query log (opt-in): statements over the threshold are kept in a ring
+# buffer shown at /admin/slow-queries, and a sampled share of slow SELECTs
+# get an EXPLAIN (ANALYZE, BUFFERS) plan
+SLOW_QUERY_LOG = os.environ.get('SLOW_QUERY_LOG', '').lower() in ('1', 'true', 'yes')
+SLOW_QUERY_THRESHOLD_MS = float(os.environ.get('SLOW_QUERY_THRESHOLD_MS', 200))
+SLOW_QUERY_EXPLAIN_RATE = float(os.environ.get('SLOW_QUERY_EXPLAIN_RATE', 0.1))
+SLOW_QUERY_BUFFER_SIZE = int(os.environ.get('SLOW_QUERY_BUFFER_SIZE', 200))
+SLOW_QUERY_FILE = os.environ.get('SLOW_QUERY_FILE')
+# /admin/slow-queries is served in debug mode, or outside it to requests
+# sending this value in X-Slow-Query-Token
+SLOW_QUERY_TOKEN = os.environ.get('SLOW_QUERY_TOKEN')
+
+# Query budgets: the most SQL statements a request to an endpoint may issue,
+# on top of the @query_budget() declarations in app.py. QUERY_BUDGET_MODE is
+# 'raise', 'log' or 'count'; by default it raises under testing, logs in
+# debug mode and only counts violations on /metrics otherwise.
+QUERY_BUDGETS = {}
+QUERY_BUDGET_MODE = os.environ.get('QUERY_BUDGET_MODE')
+
+# Connection pool, per worker process
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 5))
+DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 10))
+DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 30))
+# Seconds before a connection is replaced; pre-ping drops connections that
+# died with a Postgres restart before they are handed to a request
+DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', 'true').lower() in ('1', 'true', 'yes')
+
+# Statement timeouts in milliseconds (0 disables). DB_STATEMENT_TIMEOUT_MS
+# applies to every connection; STATEMENT_TIMEOUTS overrides it per route
+# class. Routes are 'read' (GET) or 'write' unless ROUTE_CLASSES says otherwise.
+DB_STATEMENT_TIMEOUT_MS = int(os.environ.get('DB_STATEMENT_TIMEOUT_MS', 0))
+STATEMENT_TIMEOUTS = {
+    'read': int(os.environ.get('READ_STATEMENT_TIMEOUT_MS', DB_STATEMENT_TIMEOUT_MS)),
+    'write': int(os.environ.get('WRITE_STATEMENT_TIMEOUT_MS', DB_STATEMENT_TIMEOUT_MS)),
+    'export': int(os.environ.get('EXPORT_STATEMENT_TIMEOUT_MS', 0)),
+}
+ROUTE_CLASSES = {
+    'pages.export': 'export',
+}
+
+# Read replicas (comma-separated URLs). GET requests are served by a healthy
+# replica; a replica lagging more than REPLICA_MAX_LAG_SECONDS is skipped.
+# After a write the browser reads from the primary for REPLICA_STICKY_SECONDS.
+REPLICA_URLS = [url for url in os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if url]
+REPLICA_HEALTH_INTERVAL = float(os.environ.get('REPLICA_HEALTH_INTERVAL', 5))
+REPLICA_MAX_LAG_SECONDS = float(os.environ.get('REPLICA_MAX_LAG_SECONDS', 10))
+REPLICA_STICKY_SECONDS = float(os.environ.get('REPLICA_STICKY_SECONDS', 5))
+# Reads that feed a write always use the primary
+PRIMARY_ENDPOINTS = ['venues.edit_venue', 'artists.edit_artist']
+# POST endpoints that only read
+READ_ONLY_ENDPOINTS = ['venues.search_venues', 'artists.search_artists']
+
+# Date display: babel locale (default: the LC_TIME locale) and an IANA
+# timezone show times are converted to (default: shown as stored)
+BABEL_LOCALE = os.environ.get('BABEL_LOCALE')
+DISPLAY_TIMEZONE = os.environ.get('DISPLAY_TIMEZONE')
+
+# Response compression: text responses of at least COMPRESS_MIN_SIZE bytes,
+# brotli (when installed) preferred over gzip. Whitespace stripping removes
+# template indentation when templates are compiled.
+COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 1024))
+COMPRESS_GZIP_LEVEL = 6
+COMPRESS_BROTLI_QUALITY = 4
+COMPRESS_STRIP_WHITESPACE = os.environ.get('COMPRESS_STRIP_WHITESPACE', '').lower() in ('1', 'true', 'yes')
+
+# ASGI mode (asgi.py): the async engine's driver, or a full URL when it
+# differs from the primary's, and the threads that serve the WSGI routes
+ASYNC_DATABASE_DRIVER = os.environ.get('ASYNC_DATABASE_DRIVER', 'postgresql+psycopg')
+ASYNC_DATABASE_URL = os.environ.get('ASYNC_DATABASE_URL')
+ASGI_THREADS = int(os.environ.get('ASGI_THREADS', 10))
+
+# "flask serve": gunicorn with the app preloaded. Workers default to 2 per
+# CPU core + 1 and threads to DB_POOL_SIZE; size both so that workers x
+# (DB_POOL_SIZE + DB_MAX_OVERFLOW) fits Postgres' max_connections. A worker
+# is replaced after SERVE_MAX_REQUESTS requests, give or take the jitter.
+SERVE_BIND = os.environ.get('SERVE_BIND', '0.0.0.0:{}'.format(os.environ.get('PORT', 5000)))
+SERVE_WORKERS = int(os.environ.get('SERVE_WORKERS', os.environ.get('WEB_CONCURRENCY', 0)))
+SERVE_THREADS = int(os.environ.get('SERVE_THREADS', 0))
+SERVE_MAX_REQUESTS = int(os.environ.get('SERVE_MAX_REQUESTS', 1000))
+SERVE_MAX_REQUESTS_JITTER = int(os.environ.get('SERVE_MAX_REQUESTS_JITTER', 100))
+SERVE_TIMEOUT = int(os.environ.get('SERVE_TIMEOUT', 30))
+SERVE_GRACEFUL_TIMEOUT = int(os.environ.get('SERVE_GRACEFUL_TIMEOUT', 30))
+SERVE_KEEPALIVE = int(os.environ.get('SERVE_KEEPALIVE', 5))
+SERVE_PIDFILE = os.environ.get('SERVE_PIDFILE')
+
+# Logging (when DEBUG is off): JSON lines, one per request plus errors, written
+# by a background thread to stderr, or appended to LOG_FILE when set (reopened
+# when moved away, so rotate it with logrotate). Records beyond LOG_QUEUE_SIZE
+# waiting to be written are dropped; an exception repeated from the same place
+# is logged LOG_ERROR_BURST times per LOG_ERROR_WINDOW seconds at most.
+LOG_FILE = os.environ.get('LOG_FILE')
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE', 10000))
+LOG_REQUESTS = os.environ.get('LOG_REQUESTS', 'true').lower() in ('1', 'true', 'yes')
+LOG_ERROR_BURST = int(os.environ.get('LOG_ERROR_BURST', 5))
+LOG_ERROR_WINDOW = float(os.environ.get('LOG_ERROR_WINDOW', 60))
+
+# Jinja bytecode cache shared by every worker; "flask compile-templates"
+# fills it at deploy time. Empty to disable.
+TEMPLATE_CACHE_DIR = os.environ.get('TEMPLATE_CACHE_DIR', os.path.join(basedir, '.jinja_cache'))
+
+# create_app() logs a warning when it takes longer; "python -m benchmarks
+# cold-start" fails when a fresh worker (imports + create_app + first
+# request) exceeds it
+COLD_START_BUDGET_MS = int(os.environ.get('COLD_START_BUDGET_MS', 1500))
@@ -0,0 +1,96 @@
+#----------------------------------------------------------------------------#
+# Imports
+#----------------------------------------------------------------------------#
+
+import csv
+import io
+import json
+from datetime import datetime
+from models import db, Venue, Artist, Show
+
+#----------------------------------------------------------------------------#
+# Streaming Export.
+# Rows are read through a server-side cursor in batches of EXPORT_BATCH and
+# serialized as they arrive, so memory use does not grow with the table.
+# The output round-trips through "flask import".
+#----------------------------------------------------------------------------#
+
+EXPORT_BATCH = 1000
+
+FORMATS = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+}
+
+
+def export_columns(kind):
+    if kind == 'venues':
+        return [
+            Venue.id, Venue.name, Venue.genres, Venue.address, Venue.city, Venue.state, Venue.phone,
+            Venue.website, Venue.facebook_link, Venue.seeking_talent, Venue.seeking_description, Venue.image_link
+        ]
+    if kind == 'artists':
+        return [
+            Artist.id, Artist.name, Artist.genres, Artist.city, Artist.state, Artist.phone,
+            Artist.facebook_link, Artist.seeking_venue, Artist.seeking_description, Artist.image_link
+        ]
+    if kind == 'shows':
+        return [
+            Show.id,
+            Show.venue_id,
+            Venue.name.label('venue_name'),
+            Show.artist_id,
+            Artist.name.label('artist_name'),
+            Show.date.label('start_time')
+        ]
+    raise ValueError(f'Unknown export: {kind}')
+
+
+def export_rows(kind):
+    columns = export_columns(kind)
+    query = db.session.query(*columns)
+    if kind == 'shows':
+        # Names are joined on the fly rather than looked up per row
+        query = query.join(Venue, Show.venue_id == Venue.id) \
+            .join(Artist, Show.artist_id == Artist.id) \
+            .order_by(Show.id)
+    else:
+        query = query.order_by(columns[0])
+    return [column.key for column in columns], \
+        query.execution_options(stream_results=True).yield_per(EXPORT_BATCH)
+
+
+def csv_value(value):
+    if isinstance(value, list):
+        return ';'.join(value)
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    return value
+
+
+def json_value(value):
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    return str(value)
+
+
+def generate_export(kind, format):
+    # Yields one text chunk per EXPORT_BATCH rows
+    try:
+        names, rows = export_rows(kind)
+        buffer = io.StringIO()
+        if format == 'csv':
+            writer = csv.writer(buffer)
+            writer.writerow(names)
+        for count, row in enumerate(rows, 1):
+            if format == 'csv':
+                writer.writerow([csv_value(value) for value in row])
+            else:
+                buffer.write(json.dumps(dict(zip(names, row)), default=json_value) + '\n')
+            if count % EXPORT_BATCH == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+    finally:
+        db.session.close()
@@ -1,6 +1,11 @@
+import os
+import time
 from fabric.api import local, settings, abort
 from fabric.contrib.console import confirm
 
+# "flask --app app serve --pid fyyur.pid" on self-hosted machines
+PIDFILE = 'fyyur.pid'
+
 # prepare for deployment
 
 
@@ -13,6 +18,14 @@ def test():
         abort("Aborted at user request.")
 
 
+def benchmark():
+    with settings(warn_only=True):
+        result = local("python -m benchmarks run", capture=True)
+    print(result)
+    if result.failed and not confirm("Performance regressed. Continue?"):
+        abort("Aborted at user request.")
+
+
 def commit():
     message = raw_input("Enter a git commit message: ")
     local("git add . && git commit -am '{}'".format(message))
@@ -24,6 +37,7 @@ def push():
 
 def prepare():
     test()
+    benchmark()
     commit()
     push()
 
@@ -51,6 +65,68 @@ def deploy():
     heroku()
     heroku_test()
 
+# reload a self-hosted "flask serve" without dropping requests
+
+
+def read_pid(path):
+    with open(path) as f:
+        return int(f.read().strip())
+
+
+def running(pid):
+    try:
+        os.kill(pid, 0)
+    except OSError:
+        return False
+    return True
+
+
+def workers(pid):
+    with settings(warn_only=True):
+        output = local("pgrep -P {}".format(pid), capture=True)
+    return output.split()
+
+
+def new_master(old):
+    # Where the new master's pid goes depends on the gunicorn version: a
+    # second pidfile, or the usual one once the old master renamed its own
+    if os.path.exists(PIDFILE + '.2'):
+        return read_pid(PIDFILE + '.2')
+    if os.path.exists(PIDFILE + '.oldbin') and os.path.exists(PIDFILE) and read_pid(PIDFILE) != old:
+        return read_pid(PIDFILE)
+    return None
+
+
+def reload():
+    old = read_pid(PIDFILE)
+    expected = len(workers(old))
+    # New master with the new code, on the same socket. It writes its pid
+    # file only once the preloaded app has been built.
+    local("kill -USR2 {}".format(old))
+    for _ in range(30):
+        time.sleep(1)
+        new = new_master(old)
+        if new is not None:
+            break
+    else:
+        abort("No new master started; the old one is still serving.")
+
+    # Wait for the new master to run as many workers as the old one, still
+    # up a moment later: a worker that fails to boot takes its master down
+    for _ in range(60):
+        time.sleep(1)
+        if not running(new):
+            abort("The new master exited; the old one is still serving.")
+        if len(workers(new)) >= expected:
+            time.sleep(2)
+            if running(new) and len(workers(new)) >= expected:
+                break
+    else:
+        local("kill -TERM {}".format(new))
+        abort("The new workers did not boot; stopped the new master, the old one is still serving.")
+    # Drain and stop the old master and its workers
+    local("kill -QUIT {}".format(old))
+
 # rollback
 
 
@@ -0,0 +1,94 @@
+#----------------------------------------------------------------------------#
+# Imports
+#----------------------------------------------------------------------------#
+
+from datetime import datetime
+from functools import lru_cache
+
+#----------------------------------------------------------------------------#
+# Date Formatting.
+# Patterns and locales are resolved once and the compiled babel pattern is
+# applied directly, skipping format_datetime()'s per-call lookups. Show
+# dates are naive in the app's local time; with DISPLAY_TIMEZONE set they
+# are converted before formatting. babel and dateutil load on first use.
+#----------------------------------------------------------------------------#
+
+FORMATS = {
+    'full': "EEEE MMMM, d, y 'at' h:mma",
+    'medium': "EE MM, dd, y h:mma",
+}
+
+
+class DateFormatter(object):
+
+    def __init__(self):
+        self.locale = None
+        self.timezone = None
+
+    def init_app(self, app):
+        self.locale = app.config.get('BABEL_LOCALE')
+        self.timezone = app.config.get('DISPLAY_TIMEZONE')
+        self.format.cache_clear()
+        app.jinja_env.filters['datetime'] = self.format
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def pattern(format):
+        import babel.dates
+        return babel.dates.parse_pattern(FORMATS.get(format, format))
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def resolve_locale(locale):
+        import babel
+        return babel.Locale.parse(locale or babel.default_locale('LC_TIME'))
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def resolve_timezone(name):
+        if not name:
+            return None
+        try:
+            from zoneinfo import ZoneInfo
+        except ImportError:
+            from dateutil.tz import gettz as ZoneInfo
+        return ZoneInfo(name)
+
+    def warm_up(self):
+        # Imports babel and compiles the patterns up front, e.g. before
+        # server workers fork
+        for format in FORMATS:
+            self.pattern(format)
+        self.resolve_locale(self.locale)
+        self.resolve_timezone(self.timezone)
+
+    def localize(self, value, tz):
+        if isinstance(value, str):
+            # Callers that still pass str(date)
+            import dateutil.parser
+            value = dateutil.parser.parse(value)
+        zone = self.resolve_timezone(tz or self.timezone)
+        if zone is not None and isinstance(value, datetime):
+            value = value.astimezone(zone)
+        return value
+
+    @lru_cache(maxsize=8192)
+    def format(self, value, format='medium', locale=None, tz=None):
+        # Show lists repeat across pages and requests, so results are memoized too
+        pattern = self.pattern(format)
+        return pattern.apply(self.localize(value, tz), self.resolve_locale(locale or self.locale))
+
+    def format_many(self, values, format='medium', locale=None, tz=None):
+        pattern = self.pattern(format)
+        locale = self.resolve_locale(locale or self.locale)
+        return [pattern.apply(self.localize(value, tz), locale) for value in values]
+
+    def format_shows(self, shows, format='full', key='start_time'):
+        # Adds <key>_text to every show dict, e.g. start_time_text
+        texts = self.format_many([show[key] for show in shows], format)
+        for show, text in zip(shows, texts):
+            show[key + '_text'] = text
+        return shows
+
+
+date_formatter = DateFormatter()
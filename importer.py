@@ -0,0 +1,227 @@
+#----------------------------------------------------------------------------#
+# Imports
+#----------------------------------------------------------------------------#
+
+import csv
+import json
+import os
+from itertools import islice
+from werkzeug.datastructures import MultiDict
+from forms import VenueForm, ArtistForm, ShowForm
+from models import db, Venue, Artist, Show, refresh_show_counters
+from cache import entity_cache, page_cache, cache_key
+
+#----------------------------------------------------------------------------#
+# Bulk Import.
+# Rows are streamed from CSV/JSONL, validated with the same forms as the
+# create pages and written one chunk per executemany + commit.
+#----------------------------------------------------------------------------#
+
+# Columns loaded as-is next to the validated form fields, with the
+# defaults the model constructors use
+EXTRA_COLUMNS = {
+    'venues': {'website': None, 'seeking_talent': False, 'seeking_description': ''},
+    'artists': {'seeking_venue': False, 'seeking_description': ''},
+    'shows': {},
+}
+
+FORMS = {
+    'venues': VenueForm,
+    'artists': ArtistForm,
+    'shows': ShowForm,
+}
+
+MODELS = {
+    'venues': Venue,
+    'artists': Artist,
+    'shows': Show,
+}
+
+BOOLEAN_COLUMNS = ('seeking_talent', 'seeking_venue')
+
+# Multi-valued columns; CSV cells separate values with ';'
+LIST_COLUMNS = ('genres',)
+
+
+class MalformedRow(object):
+    # A line that could not be parsed; rejected like a row that fails validation
+
+    def __init__(self, text, error):
+        self.text = text
+        self.error = error
+
+
+def read_rows(path, format=None):
+    # Yields (line number, row) pairs
+    format = format or os.path.splitext(path)[1].lstrip('.').lower()
+    with open(path, newline='', encoding='utf-8') as f:
+        if format == 'csv':
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, row
+        elif format in ('jsonl', 'ndjson'):
+            for number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError as e:
+                    yield number, MalformedRow(line.rstrip('\r\n'), f'Not valid JSON: {e}')
+                    continue
+                if isinstance(row, dict):
+                    yield number, row
+                else:
+                    yield number, MalformedRow(line.rstrip('\r\n'), 'Not a JSON object.')
+        else:
+            raise ValueError(f'Unsupported import format: {format}')
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def to_formdata(row):
+    formdata = MultiDict()
+    for key, value in row.items():
+        if value is None:
+            continue
+        if key in LIST_COLUMNS and isinstance(value, str):
+            value = [v.strip() for v in value.split(';') if v.strip()]
+        if isinstance(value, (list, tuple)):
+            for v in value:
+                formdata.add(key, v)
+        else:
+            formdata.add(key, str(value))
+    return formdata
+
+
+def to_bool(value):
+    if isinstance(value, str):
+        return value.strip().lower() in ('1', 'true', 'yes', 'y', 't')
+    return bool(value)
+
+
+def validate_row(kind, row):
+    if isinstance(row, MalformedRow):
+        return None, {'row': [row.error]}
+    form = FORMS[kind](formdata=to_formdata(row), meta={'csrf': False})
+    if not form.validate():
+        return None, form.errors
+
+    if kind == 'shows':
+        values = {
+            'venue_id': form.venue_id.data or None,
+            'artist_id': form.artist_id.data or None,
+            'date': form.start_time.data,
+            # Resolved to ids in batches when no id is given
+            'venue_name': row.get('venue_name'),
+            'artist_name': row.get('artist_name'),
+        }
+    else:
+        values = {name: field.data for name, field in form._fields.items()}
+    # Every row carries the same keys so a chunk is a single executemany
+    for column, default in EXTRA_COLUMNS[kind].items():
+        if row.get(column) in (None, ''):
+            values[column] = default
+        else:
+            values[column] = to_bool(row[column]) if column in BOOLEAN_COLUMNS else row[column]
+    return values, None
+
+
+def resolve_keys(model, rows, id_key, name_key):
+    # Check given ids and look up ids for given names with one query each
+    ids, names = set(), set()
+    for values, errors in rows:
+        if values is None:
+            continue
+        if values[id_key]:
+            try:
+                values[id_key] = int(values[id_key])
+                ids.add(values[id_key])
+            except ValueError:
+                errors[id_key] = ['Not a valid id.']
+        elif values[name_key]:
+            names.add(values[name_key])
+        else:
+            errors[id_key] = ['An id or a name is required.']
+
+    known = set()
+    if ids:
+        known = {id for id, in db.session.query(model.id).filter(model.id.in_(ids))}
+    by_name = {}
+    if names:
+        for name, id in db.session.query(model.name, model.id).filter(model.name.in_(names)):
+            by_name.setdefault(name, []).append(id)
+
+    for values, errors in rows:
+        if values is None or errors:
+            continue
+        if values[id_key]:
+            if values[id_key] not in known:
+                errors[id_key] = [f'No {model.__tablename__} with id {values[id_key]}.']
+        else:
+            matches = by_name.get(values[name_key], [])
+            if len(matches) == 1:
+                values[id_key] = matches[0]
+            else:
+                errors[name_key] = [f'{len(matches)} {model.__tablename__}s named {values[name_key]!r}.']
+
+
+def import_file(kind, path, format=None, chunk_size=1000, reject_file=None, progress=None):
+    model = MODELS[kind]
+    stats = {'read': 0, 'imported': 0, 'rejected': 0}
+    rejects = open(reject_file, 'w', encoding='utf-8') if reject_file else None
+    try:
+        for chunk in chunked(read_rows(path, format), chunk_size):
+            rows = []
+            for line, row in chunk:
+                values, errors = validate_row(kind, row)
+                rows.append((values, errors or {}))
+
+            if kind == 'shows':
+                resolve_keys(Venue, rows, 'venue_id', 'venue_name')
+                resolve_keys(Artist, rows, 'artist_id', 'artist_name')
+
+            accepted = []
+            for (values, errors), (line, row) in zip(rows, chunk):
+                if values is None or errors:
+                    stats['rejected'] += 1
+                    if rejects:
+                        if isinstance(row, MalformedRow):
+                            row = row.text
+                        rejects.write(json.dumps({'line': line, 'row': row, 'errors': errors}, default=str) + '\n')
+                else:
+                    values.pop('venue_name', None)
+                    values.pop('artist_name', None)
+                    accepted.append(values)
+                stats['read'] += 1
+
+            if accepted:
+                db.session.execute(model.__table__.insert(), accepted)
+                if kind == 'shows':
+                    venue_ids = {values['venue_id'] for values in accepted}
+                    artist_ids = {values['artist_id'] for values in accepted}
+                    refresh_show_counters(Venue, Venue.id.in_(venue_ids))
+                    refresh_show_counters(Artist, Artist.id.in_(artist_ids))
+                db.session.commit()
+                if kind == 'shows':
+                    entity_cache.delete(*[cache_key('venue_shows', id) for id in venue_ids] +
+                                        [cache_key('artist_shows', id) for id in artist_ids])
+                page_cache.invalidate(*model.page_tags)
+                stats['imported'] += len(accepted)
+
+            if progress:
+                progress(stats)
+    except:
+        db.session.rollback()
+        raise
+    finally:
+        db.session.close()
+        if rejects:
+            rejects.close()
+    return stats
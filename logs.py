@@ -0,0 +1,207 @@
+#----------------------------------------------------------------------------#
+# Imports
+#----------------------------------------------------------------------------#
+
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, WatchedFileHandler
+from flask import current_app, g, has_request_context, request
+from metrics import metrics
+
+#----------------------------------------------------------------------------#
+# Structured Logging.
+# Request threads only put records on a bounded queue; a background thread
+# formats them as one JSON object per line and does the writing, so a slow
+# disk never holds up a request. When the writer falls behind, records are
+# dropped and counted instead of piling up in memory. Records logged during
+# a request carry its route, request id and elapsed time.
+#----------------------------------------------------------------------------#
+
+# Attributes every LogRecord has; anything else was passed in extra=
+RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class RequestContextFilter(logging.Filter):
+    # Runs in the request thread, where the request is still available
+
+    def filter(self, record):
+        if has_request_context():
+            record.request_id = g.get('request_id')
+            record.method = request.method
+            record.path = request.path
+            record.route = request.url_rule.rule if request.url_rule else None
+            record.endpoint = request.endpoint
+            if 'request_start' in g:
+                record.elapsed_ms = round((time.perf_counter() - g.request_start) * 1000, 2)
+        return True
+
+
+class RepeatedErrorFilter(logging.Filter):
+    # The same exception raised from the same place is logged at most
+    # `burst` times per `window` seconds; the next one logged after that
+    # says how many were suppressed
+
+    def __init__(self, burst, window, suppressed=None):
+        super().__init__()
+        self.burst = burst
+        self.window = window
+        self.suppressed = suppressed
+        self.seen = {}
+        self.lock = threading.Lock()
+
+    def key(self, record):
+        exc_type, _, tb = record.exc_info
+        while tb is not None and tb.tb_next is not None:
+            tb = tb.tb_next
+        origin = (tb.tb_frame.f_code.co_filename, tb.tb_lineno) if tb is not None else None
+        return exc_type.__name__, origin, record.pathname, record.lineno
+
+    def filter(self, record):
+        if not record.exc_info or not record.exc_info[0]:
+            return True
+        key = self.key(record)
+        now = time.monotonic()
+        with self.lock:
+            if len(self.seen) > 1000:
+                self.seen.clear()
+            state = self.seen.setdefault(key, [now, 0, 0])
+            carried = 0
+            if now - state[0] >= self.window:
+                carried = state[2]
+                state[:] = [now, 0, 0]
+            state[1] += 1
+            if state[1] > self.burst:
+                state[2] += 1
+                if self.suppressed is not None:
+                    self.suppressed.inc()
+                return False
+        if carried:
+            record.suppressed = carried
+        return True
+
+
+class BoundedQueueHandler(QueueHandler):
+
+    def __init__(self, records, dropped=None):
+        super().__init__(records)
+        self.dropped = dropped
+        self.exception_formatter = logging.Formatter()
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            if self.dropped is not None:
+                self.dropped.inc()
+
+    def prepare(self, record):
+        # Only what cannot cross threads is resolved here: the message
+        # arguments and the traceback. JSON encoding is the writer's job.
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        if record.exc_info:
+            record.exc_text = self.exception_formatter.formatException(record.exc_info)
+        record.msg, record.args, record.exc_info = record.message, None, None
+        return record
+
+
+class JSONFormatter(logging.Formatter):
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for name, value in vars(record).items():
+            if name not in RECORD_ATTRIBUTES and value is not None:
+                entry[name] = value
+        if record.levelno >= logging.WARNING:
+            entry['source'] = f'{record.pathname}:{record.lineno}'
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class StructuredLog(object):
+
+    def __init__(self):
+        self.handler = None
+        self.listener = None
+        self.dropped = metrics.counter(
+            'fyyur_log_records_dropped_total', 'Log records dropped because the writer fell behind.')
+        self.suppressed = metrics.counter(
+            'fyyur_log_records_suppressed_total', 'Repeated exceptions left out of the log.')
+
+    def init_app(self, app):
+        self.log_requests = app.config.get('LOG_REQUESTS', True)
+        app.before_request(self.start_request)
+        app.after_request(self.finish_request)
+
+        logger = app.logger
+        logger.setLevel(app.config.get('LOG_LEVEL', 'INFO'))
+        if self.handler is None:
+            self.queue_size = app.config.get('LOG_QUEUE_SIZE', 10000)
+            path = app.config.get('LOG_FILE')
+            writer = WatchedFileHandler(path) if path else logging.StreamHandler(sys.stderr)
+            writer.setFormatter(JSONFormatter())
+            self.writer = writer
+
+            self.handler = BoundedQueueHandler(queue.Queue(maxsize=self.queue_size), self.dropped)
+            self.handler.addFilter(RequestContextFilter())
+            self.handler.addFilter(RepeatedErrorFilter(
+                app.config.get('LOG_ERROR_BURST', 5), app.config.get('LOG_ERROR_WINDOW', 60), self.suppressed))
+            self.start()
+            atexit.register(self.stop)
+            # The writer thread does not survive a fork; each child starts its own
+            os.register_at_fork(after_in_child=self.restart)
+
+        # One process-wide logger, however many apps are built
+        from flask.logging import default_handler
+        logger.removeHandler(default_handler)
+        if self.handler not in logger.handlers:
+            logger.addHandler(self.handler)
+
+    def start(self):
+        self.listener = QueueListener(self.handler.queue, self.writer, respect_handler_level=True)
+        self.listener.start()
+
+    def stop(self):
+        if self.listener is not None:
+            try:
+                self.listener.stop()
+            except queue.Full:
+                pass
+            self.listener = None
+
+    def restart(self):
+        # The parent's queue may have been mid-update when it forked
+        self.handler.queue = queue.Queue(maxsize=self.queue_size)
+        self.start()
+
+    def start_request(self):
+        g.request_id = request.headers.get('X-Request-ID') or uuid.uuid4().hex
+
+    def finish_request(self, response):
+        if 'request_id' in g:
+            response.headers['X-Request-ID'] = g.request_id
+            if self.log_requests and request.endpoint != 'metrics':
+                current_app.logger.info(
+                    '%s %s %s', request.method, request.full_path.rstrip('?'), response.status_code,
+                    extra={'status': response.status_code, 'queries': g.get('query_count')})
+        return response
+
+
+structured_log = StructuredLog()
@@ -0,0 +1,245 @@
+#----------------------------------------------------------------------------#
+# Imports
+#----------------------------------------------------------------------------#
+
+import os
+import threading
+import time
+from bisect import bisect_left
+from flask import Response, g, has_request_context, request, before_render_template, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError
+from sqlalchemy.pool import QueuePool
+
+#----------------------------------------------------------------------------#
+# Metric Types.
+# Minimal Prometheus text-format counters and histograms. Values live in the
+# worker process, so each worker exposes its own series on /metrics, labelled
+# with its pid as `worker`: a scrape reaches one worker of "flask serve", and
+# without the label series from different workers would look like one
+# counter going up and down. Aggregate across workers after rate(), e.g.
+# sum without (worker) (rate(fyyur_request_duration_seconds_count[5m])).
+#----------------------------------------------------------------------------#
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 250, 1000)
+
+
+def format_labels(names, values, *extra):
+    # extra: (name, value) pairs added to the metric's own labels
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+class Counter(object):
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, '') for name in self.labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self, *constant):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        with self.lock:
+            for key, value in sorted(self.values.items()):
+                lines.append(f'{self.name}{format_labels(self.labels, key, *constant)} {value}')
+        return lines
+
+
+class Gauge(object):
+    # Current values read from callbacks at scrape time
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.functions = {}
+        self.lock = threading.Lock()
+
+    def set_function(self, function, **labels):
+        key = tuple(labels.get(name, '') for name in self.labels)
+        with self.lock:
+            self.functions[key] = function
+
+    def render(self, *constant):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} gauge']
+        with self.lock:
+            functions = sorted(self.functions.items())
+        for key, function in functions:
+            lines.append(f'{self.name}{format_labels(self.labels, key, *constant)} {function()}')
+        return lines
+
+
+class Histogram(object):
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, '') for name in self.labels)
+        with self.lock:
+            series = self.series.get(key)
+            if series is None:
+                series = self.series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][bisect_left(self.buckets, value)] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self, *constant):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self.lock:
+            for key, (counts, total, count) in sorted(self.series.items()):
+                cumulative = 0
+                for bound, bucket in zip(self.buckets + ('+Inf',), counts):
+                    cumulative += bucket
+                    lines.append(f'{self.name}_bucket{format_labels(self.labels, key, *constant, ("le", bound))} {cumulative}')
+                lines.append(f'{self.name}_sum{format_labels(self.labels, key, *constant)} {total}')
+                lines.append(f'{self.name}_count{format_labels(self.labels, key, *constant)} {count}')
+        return lines
+
+#----------------------------------------------------------------------------#
+# Pool Instrumentation.
+#----------------------------------------------------------------------------#
+
+
+class TimedQueuePool(QueuePool):
+    # QueuePool that reports how long each checkout waited for a connection
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super(TimedQueuePool, self).connect()
+        except TimeoutError:
+            metrics.pool_timeouts.inc()
+            raise
+        finally:
+            metrics.pool_checkout.observe(time.perf_counter() - start)
+
+
+def track_pool(pool, capacity, name='primary'):
+    # Expose the pool's open/checked-out connections and utilization on /metrics
+    metrics.pool_size.set_function(lambda: pool.checkedin() + pool.checkedout(), pool=name)
+    metrics.pool_checked_out.set_function(pool.checkedout, pool=name)
+    metrics.pool_utilization.set_function(lambda: round(pool.checkedout() / float(capacity), 3), pool=name)
+
+#----------------------------------------------------------------------------#
+# Request Metrics.
+#----------------------------------------------------------------------------#
+
+
+class Metrics(object):
+
+    def __init__(self):
+        self.registry = []
+        self.request_latency = self.histogram(
+            'fyyur_request_duration_seconds', 'Time spent serving a request.', ('endpoint', 'method', 'status'))
+        self.request_queries = self.histogram(
+            'fyyur_request_queries', 'SQL statements issued per request.', ('endpoint',), COUNT_BUCKETS)
+        self.request_db_time = self.histogram(
+            'fyyur_request_db_seconds', 'Time spent in SQL statements per request.', ('endpoint',))
+        self.template_render = self.histogram(
+            'fyyur_template_render_seconds', 'Time spent rendering a template.', ('template',))
+        self.pool_checkout = self.histogram(
+            'fyyur_pool_checkout_seconds', 'Time spent waiting for a pooled connection.')
+        self.pool_timeouts = self.counter(
+            'fyyur_pool_timeouts_total', 'Checkouts that gave up after DB_POOL_TIMEOUT.')
+        self.pool_size = self.gauge(
+            'fyyur_pool_connections', 'Connections currently open in the pool.', ('pool',))
+        self.pool_checked_out = self.gauge(
+            'fyyur_pool_checked_out', 'Connections currently checked out of the pool.', ('pool',))
+        self.pool_utilization = self.gauge(
+            'fyyur_pool_utilization', 'Checked-out connections over pool_size + max_overflow.', ('pool',))
+
+    def histogram(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        metric = Histogram(name, help, labels, buckets)
+        self.registry.append(metric)
+        return metric
+
+    def counter(self, name, help, labels=()):
+        metric = Counter(name, help, labels)
+        self.registry.append(metric)
+        return metric
+
+    def gauge(self, name, help, labels=()):
+        metric = Gauge(name, help, labels)
+        self.registry.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        worker = ('worker', os.getpid())
+        for metric in self.registry:
+            lines.extend(metric.render(worker))
+        return '\n'.join(lines) + '\n'
+
+    def init_app(self, app):
+        app.before_request(self.start_request)
+        app.after_request(self.finish_request)
+        before_render_template.connect(self.start_render, app)
+        template_rendered.connect(self.finish_render, app)
+        # Engine-wide so every engine the app creates is counted, once per
+        # process however many apps are built
+        for name, listener in (('before_cursor_execute', self.start_query),
+                               ('after_cursor_execute', self.finish_query),
+                               ('handle_error', self.fail_query)):
+            if not event.contains(Engine, name, listener):
+                event.listen(Engine, name, listener)
+        app.add_url_rule('/metrics', 'metrics', self.expose)
+
+    def expose(self):
+        return Response(self.render(), mimetype='text/plain; version=0.0.4')
+
+    def start_request(self):
+        g.request_start = time.perf_counter()
+        g.query_count = 0
+        g.query_time = 0.0
+
+    def finish_request(self, response):
+        if 'request_start' in g:
+            endpoint = request.endpoint or 'unknown'
+            self.request_latency.observe(time.perf_counter() - g.request_start,
+                                         endpoint=endpoint, method=request.method, status=response.status_code)
+            self.request_queries.observe(g.query_count, endpoint=endpoint)
+            self.request_db_time.observe(g.query_time, endpoint=endpoint)
+        return response
+
+    def start_render(self, sender, template, context, **extra):
+        g.setdefault('render_starts', []).append(time.perf_counter())
+
+    def finish_render(self, sender, template, context, **extra):
+        starts = g.get('render_starts')
+        if starts:
+            self.template_render.observe(time.perf_counter() - starts.pop(), template=template.name)
+
+    def start_query(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+    def finish_query(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['query_start'].pop()
+        if has_request_context() and 'query_count' in g and not conn.info.get('budget_exempt'):
+            g.query_count += 1
+            g.query_time += elapsed
+
+    def fail_query(self, context):
+        starts = context.connection.info.get('query_start') if context.connection is not None else None
+        if starts:
+            starts.pop()
+
+
+metrics = Metrics()
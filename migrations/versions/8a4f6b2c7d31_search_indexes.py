@@ -0,0 +1,31 @@
+"""trigram and full-text search indexes
+
+Revision ID: 8a4f6b2c7d31
+Revises: 5c1e3a9d2f10
+Create Date: 2026-10-18 20:10:03.412876
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8a4f6b2c7d31'
+down_revision = '5c1e3a9d2f10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for table in ('venue', 'artist'):
+        op.create_index('ix_{}_name_trgm'.format(table), table, ['name'],
+                        postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'})
+        op.create_index('ix_{}_name_tsv'.format(table), table, [sa.text("to_tsvector('simple', name)")],
+                        postgresql_using='gin')
+
+
+def downgrade():
+    for table in ('artist', 'venue'):
+        op.drop_index('ix_{}_name_tsv'.format(table), table_name=table)
+        op.drop_index('ix_{}_name_trgm'.format(table), table_name=table)
@@ -0,0 +1,39 @@
+"""denormalized show counters on venue and artist
+
+Revision ID: d7a2c5e8f013
+Revises: b3d9e1f4a6c2
+Create Date: 2026-10-18 20:58:12.091334
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd7a2c5e8f013'
+down_revision = 'b3d9e1f4a6c2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for table, key in (('venue', 'venue_id'), ('artist', 'artist_id')):
+        op.add_column(table, sa.Column('upcoming_shows_count', sa.Integer(), server_default='0', nullable=False))
+        op.add_column(table, sa.Column('past_shows_count', sa.Integer(), server_default='0', nullable=False))
+        op.add_column(table, sa.Column('next_show_date', sa.DateTime(), nullable=True))
+        op.create_index('ix_{}_next_show_date'.format(table), table, ['next_show_date'], unique=False)
+        # Backfill from the existing shows
+        op.execute("""
+            UPDATE {table} SET
+                upcoming_shows_count = (SELECT count(*) FROM show WHERE show.{key} = {table}.id AND show.date > LOCALTIMESTAMP),
+                past_shows_count = (SELECT count(*) FROM show WHERE show.{key} = {table}.id AND show.date <= LOCALTIMESTAMP),
+                next_show_date = (SELECT min(show.date) FROM show WHERE show.{key} = {table}.id AND show.date > LOCALTIMESTAMP)
+        """.format(table=table, key=key))
+
+
+def downgrade():
+    for table in ('artist', 'venue'):
+        op.drop_index('ix_{}_next_show_date'.format(table), table_name=table)
+        op.drop_column(table, 'next_show_date')
+        op.drop_column(table, 'past_shows_count')
+        op.drop_column(table, 'upcoming_shows_count')
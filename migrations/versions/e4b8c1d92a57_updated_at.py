@@ -0,0 +1,29 @@
+"""updated_at on venue, artist and show
+
+Revision ID: e4b8c1d92a57
+Revises: d7a2c5e8f013
+Create Date: 2026-10-18 22:14:37.528116
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4b8c1d92a57'
+down_revision = 'd7a2c5e8f013'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for table in ('venue', 'artist', 'show'):
+        # Existing rows start out modified "now", so cached copies revalidate once
+        op.add_column(table, sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False))
+        op.create_index('ix_{}_updated_at'.format(table), table, ['updated_at'], unique=False)
+
+
+def downgrade():
+    for table in ('show', 'artist', 'venue'):
+        op.drop_index('ix_{}_updated_at'.format(table), table_name=table)
+        op.drop_column(table, 'updated_at')
@@ -2,22 +2,91 @@
 # Imports
 #----------------------------------------------------------------------------#
 
-from flask_migrate import Migrate
-from sqlalchemy import Column, String, Integer, Boolean, DateTime, ARRAY, ForeignKey
+from sqlalchemy import Column, String, Integer, Boolean, DateTime, ARRAY, ForeignKey, Index, func, literal_column
+from flask import current_app, request, has_request_context
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event, inspect
 from datetime import datetime
+from cache import entity_cache, page_cache, cache_key
+from metrics import TimedQueuePool, track_pool
+from slowlog import slow_query_log
+from replicas import RoutingSession, replica_router
 
 #----------------------------------------------------------------------------#
 # setup_db(app) binds a flask application and a SQLAlchemy service
 #----------------------------------------------------------------------------#
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+
+def engine_options(config):
+    # Pool settings come from DB_* config so workers can be sized without code edits
+    options = dict(config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+    options.setdefault('poolclass', TimedQueuePool)
+    options.setdefault('pool_size', config['DB_POOL_SIZE'])
+    options.setdefault('max_overflow', config['DB_MAX_OVERFLOW'])
+    options.setdefault('pool_timeout', config['DB_POOL_TIMEOUT'])
+    options.setdefault('pool_recycle', config['DB_POOL_RECYCLE'])
+    options.setdefault('pool_pre_ping', config['DB_POOL_PRE_PING'])
+    if config.get('DB_STATEMENT_TIMEOUT_MS'):
+        # Connection-wide default, so the common case costs no extra round trip
+        connect_args = dict(options.get('connect_args', {}))
+        connect_args['options'] = '-c statement_timeout={}'.format(int(config['DB_STATEMENT_TIMEOUT_MS']))
+        options['connect_args'] = connect_args
+    return options
+
+
+def route_class(app):
+    endpoint = request.endpoint
+    if endpoint in app.config['ROUTE_CLASSES']:
+        return app.config['ROUTE_CLASSES'][endpoint]
+    return 'read' if request.method in ('GET', 'HEAD') else 'write'
+
+
+def set_statement_timeout(session, transaction, connection):
+    # Routes whose class has its own timeout override the connection default
+    # for each transaction they open
+    if not has_request_context():
+        return
+    default = current_app.config.get('DB_STATEMENT_TIMEOUT_MS') or 0
+    timeout = current_app.config['STATEMENT_TIMEOUTS'].get(route_class(current_app))
+    if timeout is not None and timeout != default:
+        # Not one of the route's statements: kept out of its query budget
+        connection.info['budget_exempt'] = True
+        try:
+            connection.exec_driver_sql('SET LOCAL statement_timeout = {}'.format(int(timeout)))
+        finally:
+            connection.info.pop('budget_exempt', None)
+
+
+def init_migrate(app):
+    # Only "flask db" needs Flask-Migrate; importing it pulls in alembic
+    if 'migrate' not in app.extensions:
+        from flask_migrate import Migrate
+        Migrate(app, db)
+
+
+def dispose_engines(app):
+    # Called in each worker after a fork: pooled connections inherited from
+    # the parent are dropped without being closed, so the worker opens its own
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+    replica_router.dispose()
+
 
 def db_setup(app):
-    app.config.from_object('config')
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config)
     db.app = app
     db.init_app(app)
-    migrate = Migrate(app, db)
+    entity_cache.init_app(app)
+    page_cache.init_app(app)
+    with app.app_context():
+        slow_query_log.init_app(app, db.engine)
+        track_pool(db.engine.pool, app.config['DB_POOL_SIZE'] + app.config['DB_MAX_OVERFLOW'])
+    replica_router.init_app(app, app.config['SQLALCHEMY_ENGINE_OPTIONS'])
+    # db.session is shared by every app built in this process
+    if not event.contains(db.session, 'after_begin', set_statement_timeout):
+        event.listen(db.session, 'after_begin', set_statement_timeout)
     return db
 
 #----------------------------------------------------------------------------#
@@ -38,7 +107,26 @@ class Venue(db.Model):
     seeking_talent=Column(Boolean)
     seeking_description=Column(String(400))
     image_link = Column(String(500),nullable=True)
+    # Maintained by Show writes and the sweep in refresh_show_counters()
+    upcoming_shows_count = Column(Integer, nullable=False, default=0, server_default='0')
+    past_shows_count = Column(Integer, nullable=False, default=0, server_default='0')
+    next_show_date = Column(DateTime, nullable=True)
+    # Bumped by every write to the row; drives ETag/Last-Modified (see conditional.py)
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), onupdate=func.now())
     show=db.relationship('Show',backref=db.backref('venue'), lazy=True)
+    # Listing fragments showing venue columns (see PageCache)
+    page_tags = ('venues', 'shows')
+
+    # Trigram and full-text indexes backing search (see search.py)
+    __table_args__ = (
+        Index('ix_venue_name_trgm', name, postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'}),
+        Index('ix_venue_name_tsv', func.to_tsvector(literal_column("'simple'"), name), postgresql_using='gin'),
+        # Grouping key of the /venues listing
+        Index('ix_venue_state_city', state, city),
+        Index('ix_venue_genres', genres, postgresql_using='gin'),
+        Index('ix_venue_next_show_date', next_show_date),
+        Index('ix_venue_updated_at', updated_at),
+    )
 
     def __init__(self, name, genres, address, city, state, phone, facebook_link,seeking_talent=False, seeking_description=""):
         self.name = name
@@ -54,16 +142,30 @@ class Venue(db.Model):
     def __repr__(self):
         return f'<Venue {self.id} name: {self.name}>'
 
+    def cache_keys(self):
+        # Artist pages embed this venue's name and image in their show lists
+        artist_ids = db.session.query(Show.artist_id).filter(Show.venue_id == self.id).distinct()
+        return [cache_key('venue', self.id), cache_key('venue_shows', self.id)] + \
+            [cache_key('artist_shows', artist_id) for artist_id, in artist_ids]
+
     def insert(self):
         db.session.add(self)
         db.session.commit()
+        entity_cache.delete(*self.cache_keys())
+        page_cache.invalidate(*self.page_tags)
 
     def update(self):
-         db.session.commit()
+        keys = self.cache_keys()
+        db.session.commit()
+        entity_cache.delete(*keys)
+        page_cache.invalidate(*self.page_tags)
 
     def delete(self):
+        keys = self.cache_keys()
         db.session.delete(self)
         db.session.commit()
+        entity_cache.delete(*keys)
+        page_cache.invalidate(*self.page_tags)
 
     def format(self):
         return{
@@ -78,7 +180,8 @@ class Venue(db.Model):
             'facebook_link': self.facebook_link,
             'seeking_talent': self.seeking_talent,
             'seeking_description': self.seeking_description,
-            'image-link': self.image_link
+            'image-link': self.image_link,
+            'image_link': self.image_link
         }
 
 class Artist(db.Model):
@@ -93,7 +196,26 @@ class Artist(db.Model):
     image_link=Column(String(120))
     seeking_venue=Column(Boolean)
     seeking_description=Column(String(400))
+    # Maintained by Show writes and the sweep in refresh_show_counters()
+    upcoming_shows_count = Column(Integer, nullable=False, default=0, server_default='0')
+    past_shows_count = Column(Integer, nullable=False, default=0, server_default='0')
+    next_show_date = Column(DateTime, nullable=True)
+    # Bumped by every write to the row; drives ETag/Last-Modified (see conditional.py)
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), onupdate=func.now())
     show=db.relationship('Show',backref=db.backref('artist'), lazy=True)
+    # Listing fragments showing artist columns (see PageCache)
+    page_tags = ('artists', 'shows')
+
+    # Trigram and full-text indexes backing search (see search.py)
+    __table_args__ = (
+        Index('ix_artist_name_trgm', name, postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'}),
+        Index('ix_artist_name_tsv', func.to_tsvector(literal_column("'simple'"), name), postgresql_using='gin'),
+        # Sort order of the /artists listing
+        Index('ix_artist_name', name),
+        Index('ix_artist_genres', genres, postgresql_using='gin'),
+        Index('ix_artist_next_show_date', next_show_date),
+        Index('ix_artist_updated_at', updated_at),
+    )
 
     def __init__(self, name, genres, city, state, phone, facebook_link,seeking_venue=False, seeking_description=""):
         self.name = name
@@ -108,16 +230,30 @@ class Artist(db.Model):
     def __repr__(self):
         return f'<Artist {self.id} name: {self.name}>'
 
+    def cache_keys(self):
+        # Venue pages embed this artist's name and image in their show lists
+        venue_ids = db.session.query(Show.venue_id).filter(Show.artist_id == self.id).distinct()
+        return [cache_key('artist', self.id), cache_key('artist_shows', self.id)] + \
+            [cache_key('venue_shows', venue_id) for venue_id, in venue_ids]
+
     def insert(self):
         db.session.add(self)
         db.session.commit()
+        entity_cache.delete(*self.cache_keys())
+        page_cache.invalidate(*self.page_tags)
 
     def update(self):
-         db.session.commit()
+        keys = self.cache_keys()
+        db.session.commit()
+        entity_cache.delete(*keys)
+        page_cache.invalidate(*self.page_tags)
 
     def delete(self):
+        keys = self.cache_keys()
         db.session.delete(self)
         db.session.commit()
+        entity_cache.delete(*keys)
+        page_cache.invalidate(*self.page_tags)
 
     def format(self):
         return{
@@ -130,7 +266,8 @@ class Artist(db.Model):
             'facebook_link': self.facebook_link,
             'seeking_venue': self.seeking_venue,
             'seeking_description': self.seeking_description,
-            'image-link': self.image_link
+            'image-link': self.image_link,
+            'image_link': self.image_link
         }
 
 class Show(db.Model):
@@ -139,23 +276,104 @@ class Show(db.Model):
     venue_id=Column(Integer,ForeignKey('venue.id'),nullable=False)
     artist_id=Column(Integer,ForeignKey('artist.id'),nullable=False)
     date=Column(DateTime)
-    
-    
+    # Bumped by every write to the row; drives ETag/Last-Modified (see conditional.py)
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), onupdate=func.now())
+    # /shows lists shows and /venues carries their counters
+    page_tags = ('venues', 'shows')
+
+    # Detail pages filter by venue/artist and split on date, /shows seeks on (date, id)
+    __table_args__ = (
+        Index('ix_show_venue_id_date', venue_id, date),
+        Index('ix_show_artist_id_date', artist_id, date),
+        Index('ix_show_date', date, id),
+        Index('ix_show_updated_at', updated_at),
+    )
+
     def __init__(self, venue_id, artist_id, date):
         self.venue_id = venue_id
         self.artist_id = artist_id
         self.date = date
 
+    def parents(self):
+        # Venue and artist ids the show has and, until flushed, had: moving
+        # a show changes the pages and counters of both sides
+        state = inspect(self)
+        venue_ids = {self.venue_id, *state.attrs.venue_id.history.deleted}
+        artist_ids = {self.artist_id, *state.attrs.artist_id.history.deleted}
+        return venue_ids - {None}, artist_ids - {None}
+
+    def cache_keys(self, parents=None):
+        venue_ids, artist_ids = parents or self.parents()
+        return [cache_key('venue_shows', id) for id in venue_ids] + \
+            [cache_key('artist_shows', id) for id in artist_ids]
+
+    def refresh_counters(self, parents):
+        venue_ids, artist_ids = parents
+        refresh_show_counters(Venue, Venue.id.in_(venue_ids))
+        refresh_show_counters(Artist, Artist.id.in_(artist_ids))
+
     def insert(self):
+        parents = self.parents()
         db.session.add(self)
+        db.session.flush()
+        self.refresh_counters(parents)
         db.session.commit()
+        entity_cache.delete(*self.cache_keys(parents))
+        page_cache.invalidate(*self.page_tags)
 
     def update(self):
+        # Read before the flush clears the history
+        parents = self.parents()
+        db.session.flush()
+        self.refresh_counters(parents)
         db.session.commit()
+        entity_cache.delete(*self.cache_keys(parents))
+        page_cache.invalidate(*self.page_tags)
 
     def delete(self):
+        parents = self.parents()
         db.session.delete(self)
+        db.session.flush()
+        self.refresh_counters(parents)
         db.session.commit()
+        entity_cache.delete(*self.cache_keys(parents))
+        page_cache.invalidate(*self.page_tags)
+
+#----------------------------------------------------------------------------#
+# Show counters.
+#----------------------------------------------------------------------------#
+
+SHOW_KEYS = {
+    Venue: Show.venue_id,
+    Artist: Show.artist_id,
+}
+
+
+def refresh_show_counters(model, criterion, now=None):
+    # Recount the shows of every venue/artist matching criterion in one UPDATE.
+    # Their pages changed, so updated_at moves too.
+    now = now or datetime.now()
+    shows = SHOW_KEYS[model] == model.id
+    # Lock the rows first, in id order (callers do venues before artists).
+    # Another transaction writing shows of the same venue/artist waits here
+    # until this one commits, and its recount, a later statement, then sees
+    # this one's shows; without the lock both count without the other's.
+    db.session.query(model.id).filter(criterion).order_by(model.id).with_for_update().all()
+    db.session.query(model).filter(criterion).update({
+        model.upcoming_shows_count: db.session.query(func.count(Show.id)).filter(shows, Show.date > now).scalar_subquery(),
+        model.past_shows_count: db.session.query(func.count(Show.id)).filter(shows, Show.date <= now).scalar_subquery(),
+        model.next_show_date: db.session.query(func.min(Show.date)).filter(shows, Show.date > now).scalar_subquery(),
+        model.updated_at: func.now(),
+    }, synchronize_session=False)
+
+
+def sweep_show_counters(now=None):
+    # Roll forward venues/artists whose next show has started since the last refresh
+    now = now or datetime.now()
+    for model in (Venue, Artist):
+        refresh_show_counters(model, model.next_show_date <= now, now)
+    db.session.commit()
+    page_cache.invalidate('venues')
 
 
 
@@ -0,0 +1,178 @@
+#----------------------------------------------------------------------------#
+# Imports
+#----------------------------------------------------------------------------#
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from flask import g, has_request_context, request
+from sqlalchemy import create_engine
+from metrics import track_pool
+
+try:
+    # Flask-SQLAlchemy >= 3
+    from flask_sqlalchemy.session import Session as BaseSession
+except ImportError:
+    from flask_sqlalchemy import SignallingSession as BaseSession
+
+#----------------------------------------------------------------------------#
+# Read Replicas.
+# Read-only requests are served by a healthy replica, chosen round-robin once
+# per request. Writes, and reads shortly after a write from the same
+# browser, stay on the primary so users see their own changes.
+#----------------------------------------------------------------------------#
+
+STICKY_COOKIE = 'fyyur_primary_until'
+
+# Zero when the replica has replayed everything it received, otherwise the
+# age of the last replayed transaction; NULL (not a replica) counts as zero
+LAG_QUERY = """
+    SELECT COALESCE(
+        CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+             ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END,
+        0)
+"""
+
+
+class Replica(object):
+
+    def __init__(self, name, engine):
+        self.name = name
+        self.engine = engine
+        # No traffic until the first health check has measured its lag
+        self.healthy = False
+
+
+class ReplicaRouter(object):
+
+    def __init__(self):
+        self.replicas = []
+        self.lock = threading.Lock()
+        self.counter = 0
+        self.checker_pid = None
+        self.health_interval = 5
+        self.max_lag = 10
+
+    def init_app(self, app, engine_options):
+        self.app = app
+        self.health_interval = app.config.get('REPLICA_HEALTH_INTERVAL', 5)
+        self.max_lag = app.config.get('REPLICA_MAX_LAG_SECONDS', 10)
+        self.sticky_seconds = app.config.get('REPLICA_STICKY_SECONDS', 5)
+        self.primary_endpoints = set(app.config.get('PRIMARY_ENDPOINTS', ()))
+        self.read_only_endpoints = set(app.config.get('READ_ONLY_ENDPOINTS', ()))
+        capacity = engine_options.get('pool_size', 5) + engine_options.get('max_overflow', 10)
+        self.replicas = []
+        for number, url in enumerate(app.config.get('REPLICA_URLS', []), 1):
+            engine = create_engine(url, **engine_options)
+            track_pool(engine.pool, capacity, f'replica{number}')
+            self.replicas.append(Replica(f'replica{number}', engine))
+        if self.replicas:
+            app.after_request(self.stick_to_primary)
+
+    def engine_for_request(self):
+        # None means the primary
+        if not self.replicas or not has_request_context():
+            return None
+        if 'replica_engine' not in g:
+            g.replica_engine = self.choose() if self.read_only() else None
+        return g.replica_engine
+
+    @contextmanager
+    def reads_after(self, written_at):
+        # For reads whose results outlive the request, i.e. cache fills, of
+        # data last written at written_at (a timestamp). A replica in use lags
+        # at most max_lag as of its last check, so once the write is older
+        # than that plus a check interval, every replica has it. Until then a
+        # lagging replica could put data the write just invalidated back into
+        # the cache, for every user: the primary answers.
+        if written_at and time.time() - written_at < self.max_lag + self.health_interval:
+            with self.primary():
+                yield
+        else:
+            yield
+
+    @contextmanager
+    def primary(self):
+        if not has_request_context():
+            yield
+            return
+        missing = object()
+        previous = g.get('replica_engine', missing)
+        g.replica_engine = None
+        try:
+            yield
+        finally:
+            if previous is missing:
+                g.pop('replica_engine', None)
+            else:
+                g.replica_engine = previous
+
+    def read_only(self):
+        # Search is a POST but never writes
+        if request.method not in ('GET', 'HEAD') and request.endpoint not in self.read_only_endpoints:
+            return False
+        if request.endpoint in self.primary_endpoints:
+            return False
+        until = request.cookies.get(STICKY_COOKIE, type=float)
+        return until is None or until < time.time()
+
+    def choose(self):
+        self.start_health_checks()
+        with self.lock:
+            healthy = [replica for replica in self.replicas if replica.healthy]
+            if not healthy:
+                return None
+            self.counter += 1
+            return healthy[self.counter % len(healthy)].engine
+
+    def stick_to_primary(self, response):
+        # Read-after-write: the redirect that follows a write, and anything
+        # else in the next few seconds, is read from the primary
+        if request.method not in ('GET', 'HEAD', 'OPTIONS') and request.endpoint not in self.read_only_endpoints \
+                and response.status_code < 500:
+            response.set_cookie(STICKY_COOKIE, str(time.time() + self.sticky_seconds),
+                                max_age=int(self.sticky_seconds) + 1, httponly=True)
+        return response
+
+    def start_health_checks(self):
+        # Threads do not survive a fork, so each worker starts its own
+        if self.checker_pid == os.getpid():
+            return
+        with self.lock:
+            if self.checker_pid == os.getpid():
+                return
+            self.checker_pid = os.getpid()
+            threading.Thread(target=self.check_health, name='replica-health', daemon=True).start()
+
+    def check_health(self):
+        while True:
+            for replica in self.replicas:
+                replica.healthy = self.probe(replica)
+            time.sleep(self.health_interval)
+
+    def dispose(self):
+        # In a forked worker: leave the parent's connections to the parent
+        for replica in self.replicas:
+            replica.engine.dispose(close=False)
+
+    def probe(self, replica):
+        try:
+            with replica.engine.connect() as connection:
+                lag = connection.exec_driver_sql(LAG_QUERY).scalar()
+            return float(lag) <= self.max_lag
+        except Exception:
+            return False
+
+
+replica_router = ReplicaRouter()
+
+
+class RoutingSession(BaseSession):
+    # Session whose statements go to the replica chosen for the request
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        engine = replica_router.engine_for_request()
+        if engine is not None:
+            return engine
+        return super(RoutingSession, self).get_bind(mapper, clause, **kwargs)
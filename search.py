@@ -0,0 +1,69 @@
+#----------------------------------------------------------------------------#
+# Imports
+#----------------------------------------------------------------------------#
+
+from math import ceil
+from sqlalchemy import func, or_, literal_column, select
+from models import db
+from aio import async_db
+
+#----------------------------------------------------------------------------#
+# Search Engine.
+# Names are matched through the trigram (ILIKE) and full-text (tsvector)
+# GIN indexes, ranked by relevance and paged in a single query.
+#----------------------------------------------------------------------------#
+
+PER_PAGE = 20
+
+# Must stay a literal so the planner can match the tsvector expression index
+TS_CONFIG = literal_column("'simple'")
+
+
+def escape_like(term):
+    return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def search_statement(model, search_term, page, per_page):
+    vector = func.to_tsvector(TS_CONFIG, model.name)
+    query = func.plainto_tsquery(TS_CONFIG, search_term)
+    rank = func.greatest(func.similarity(model.name, search_term), func.ts_rank(vector, query))
+
+    # Matches with their maintained upcoming show counter and the total
+    # number of matches attached to every row by a window
+    return select(
+        model.id,
+        model.name,
+        model.upcoming_shows_count,
+        func.count().over().label('total')
+    ).filter(or_(model.name.ilike(f"%{escape_like(search_term)}%"), vector.op('@@')(query))) \
+        .order_by(rank.desc(), model.name, model.id) \
+        .limit(per_page) \
+        .offset((page - 1) * per_page)
+
+
+def search_results(rows, page, per_page):
+    count = rows[0].total if rows else 0
+    return {
+        "count": count,
+        "page": page,
+        "pages": int(ceil(count / float(per_page))),
+        "data": [{
+            "id": row.id,
+            "name": row.name,
+            "num_upcoming_shows": row.upcoming_shows_count,
+        } for row in rows]
+    }
+
+
+def run_search(model, search_term, page=1, per_page=PER_PAGE):
+    search_term = (search_term or '').strip()
+    page = max(page or 1, 1)
+    rows = db.session.execute(search_statement(model, search_term, page, per_page)).all()
+    return search_results(rows, page, per_page)
+
+
+async def run_search_async(model, search_term, page=1, per_page=PER_PAGE):
+    search_term = (search_term or '').strip()
+    page = max(page or 1, 1)
+    result = await async_db.execute(search_statement(model, search_term, page, per_page))
+    return search_results(result.all(), page, per_page)
@@ -0,0 +1,87 @@
+#----------------------------------------------------------------------------#
+# Imports
+#----------------------------------------------------------------------------#
+
+import gc
+import os
+from gunicorn.app.base import BaseApplication
+
+#----------------------------------------------------------------------------#
+# Production Server.
+# "flask serve" runs gunicorn on the app the command has already built. The
+# master loads the code, templates and date patterns once and the workers
+# fork from it, sharing those pages copy-on-write. Database connections are
+# only opened in the workers. A worker is replaced after max_requests
+# (jittered, so they do not all restart at once).
+#
+# Reloading without dropping requests ("fab reload"): USR2 to the master
+# starts a new one with the new code on the same socket; QUIT to the old
+# one then lets its workers finish what they are serving. HUP replaces the
+# workers but, the app being preloaded, not the code.
+#----------------------------------------------------------------------------#
+
+
+def cpu_count():
+    # Cores this process may run on, which can be fewer than the machine has
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+class Server(BaseApplication):
+
+    def __init__(self, app, bind=None, workers=None, threads=None, max_requests=None, pidfile=None, asgi=False):
+        self.application = app
+        self.asgi = asgi
+        config = app.config
+        # A thread per pooled connection: requests never wait on the pool
+        threads = threads or config.get('SERVE_THREADS') or config['DB_POOL_SIZE']
+        if asgi:
+            worker_class = 'uvicorn_worker.UvicornWorker'
+        else:
+            worker_class = 'gthread' if threads > 1 else 'sync'
+        self.options = {
+            'bind': bind or config.get('SERVE_BIND'),
+            'workers': workers or config.get('SERVE_WORKERS') or 2 * cpu_count() + 1,
+            'threads': threads,
+            'worker_class': worker_class,
+            'max_requests': config.get('SERVE_MAX_REQUESTS') if max_requests is None else max_requests,
+            'max_requests_jitter': config.get('SERVE_MAX_REQUESTS_JITTER'),
+            'timeout': config.get('SERVE_TIMEOUT'),
+            'graceful_timeout': config.get('SERVE_GRACEFUL_TIMEOUT'),
+            'keepalive': config.get('SERVE_KEEPALIVE'),
+            'pidfile': pidfile or config.get('SERVE_PIDFILE'),
+            'preload_app': True,
+            'post_fork': self.post_fork,
+        }
+        super().__init__()
+
+    def load_config(self):
+        for name, value in self.options.items():
+            if value is not None:
+                self.cfg.set(name, value)
+
+    def load(self):
+        # Runs once, in the master
+        app = self.application
+        if app.debug:
+            app.logger.warning('Serving with DEBUG on; unset FLASK_DEBUG in production')
+        self.warm_up()
+        if self.asgi:
+            from aio import ASGIApp
+            return ASGIApp(app)
+        return app
+
+    def warm_up(self):
+        from app import compile_templates
+        from formatting import date_formatter
+        compile_templates(self.application, echo=self.application.logger.error)
+        date_formatter.warm_up()
+        # What the master built is never collected, so collections in the
+        # workers do not write to (and copy) the shared pages
+        gc.freeze()
+
+    def post_fork(self, server, worker):
+        from models import dispose_engines
+        dispose_engines(self.application)
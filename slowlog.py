@@ -0,0 +1,162 @@
+#----------------------------------------------------------------------------#
+# Imports
+#----------------------------------------------------------------------------#
+
+import hmac
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+from flask import abort, jsonify, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+#----------------------------------------------------------------------------#
+# Slow Query Log.
+# Statements slower than SLOW_QUERY_THRESHOLD_MS are kept in a ring buffer
+# (and optionally a rotating file). A sampled share of slow SELECTs is
+# re-run under EXPLAIN (ANALYZE, BUFFERS) by a background thread on its own
+# connection, so the plan never delays the request that was slow.
+#----------------------------------------------------------------------------#
+
+
+class SlowQueryLog(object):
+
+    def __init__(self):
+        self.entries = deque(maxlen=200)
+        self.lock = threading.Lock()
+        self.explains = None
+        self.explainer_pid = None
+        self.file_logger = None
+        self.token = None
+
+    def init_app(self, app, engine):
+        if not app.config.get('SLOW_QUERY_LOG', False):
+            return
+        self.engine = engine
+        self.threshold = app.config.get('SLOW_QUERY_THRESHOLD_MS', 200) / 1000.0
+        self.explain_rate = app.config.get('SLOW_QUERY_EXPLAIN_RATE', 0.1)
+        self.entries = deque(maxlen=app.config.get('SLOW_QUERY_BUFFER_SIZE', 200))
+
+        path = app.config.get('SLOW_QUERY_FILE')
+        if path:
+            handler = RotatingFileHandler(path, maxBytes=10 * 1024 * 1024, backupCount=5)
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            self.file_logger = logging.getLogger('fyyur.slow_queries')
+            self.file_logger.propagate = False
+            self.file_logger.setLevel(logging.INFO)
+            self.file_logger.addHandler(handler)
+
+        if self.explain_rate > 0:
+            # Bounded: plans are dropped rather than queued without limit
+            self.explains = queue.Queue(maxsize=100)
+
+        # Engine-wide, as in metrics.py: statements run on the replicas and
+        # on the async engine (aio.py) are logged too
+        for name, listener in (('before_cursor_execute', self.start_query),
+                               ('after_cursor_execute', self.finish_query),
+                               ('handle_error', self.fail_query)):
+            if not event.contains(Engine, name, listener):
+                event.listen(Engine, name, listener)
+        # Statements carry their parameters (search terms, form values), so
+        # the log is only served in debug mode or to holders of the token
+        self.token = app.config.get('SLOW_QUERY_TOKEN')
+        if app.debug or self.token:
+            app.add_url_rule('/admin/slow-queries', 'slow_queries', self.expose)
+
+    def start_query(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('slow_query_start', []).append(time.perf_counter())
+
+    def fail_query(self, context):
+        starts = context.connection.info.get('slow_query_start') if context.connection is not None else None
+        if starts:
+            starts.pop()
+
+    def finish_query(self, conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get('slow_query_start')
+        if not starts:
+            return
+        elapsed = time.perf_counter() - starts.pop()
+        if elapsed < self.threshold or conn.info.get('slow_query_explaining'):
+            return
+
+        entry = {
+            'time': datetime.now().isoformat(),
+            'duration_ms': round(elapsed * 1000, 2),
+            'endpoint': request.endpoint if has_request_context() else None,
+            'statement': statement,
+            'parameters': parameters,
+            'plan': None,
+        }
+        sampled = (
+            self.explains is not None and
+            not executemany and
+            statement.lstrip().upper().startswith('SELECT') and
+            random.random() < self.explain_rate
+        )
+        if sampled:
+            self.start_explainer()
+            # Plans come from the database that ran the statement; the async
+            # engine's connections only work on its event loop, so its
+            # statements are explained on the primary's sync engine
+            engine = self.engine if conn.dialect.is_async else conn.engine
+            try:
+                self.explains.put_nowait((engine, entry))
+                return
+            except queue.Full:
+                pass
+        self.record(entry)
+
+    def start_explainer(self):
+        # Threads do not survive a fork (the app is preloaded by "flask
+        # serve"), so each worker starts its own, on a queue of its own
+        if self.explainer_pid == os.getpid():
+            return
+        with self.lock:
+            if self.explainer_pid == os.getpid():
+                return
+            self.explainer_pid = os.getpid()
+            self.explains = queue.Queue(maxsize=100)
+            threading.Thread(target=self.explain_worker, args=(self.explains,),
+                             name='slow-query-explain', daemon=True).start()
+
+    def explain_worker(self, explains):
+        while True:
+            engine, entry = explains.get()
+            try:
+                with engine.connect() as connection:
+                    connection.info['slow_query_explaining'] = True
+                    # ANALYZE executes the statement; never keep its effects
+                    transaction = connection.begin()
+                    try:
+                        plan = connection.exec_driver_sql(
+                            'EXPLAIN (ANALYZE, BUFFERS) ' + entry['statement'], entry['parameters'])
+                        entry['plan'] = [line[0] for line in plan]
+                    finally:
+                        transaction.rollback()
+                        connection.info.pop('slow_query_explaining', None)
+            except Exception as e:
+                entry['plan'] = [f'EXPLAIN failed: {e}']
+            self.record(entry)
+
+    def record(self, entry):
+        with self.lock:
+            self.entries.append(entry)
+        if self.file_logger is not None:
+            self.file_logger.info(json.dumps(entry, default=str))
+
+    def expose(self):
+        if self.token and not hmac.compare_digest(request.headers.get('X-Slow-Query-Token', ''), self.token):
+            abort(404)
+        with self.lock:
+            entries = list(reversed(self.entries))
+        return jsonify(json.loads(json.dumps(entries, default=str)))
+
+
+slow_query_log = SlowQueryLog()
@@ -0,0 +1,134 @@
+#----------------------------------------------------------------------------#
+# Imports
+#----------------------------------------------------------------------------#
+
+import asyncio
+from datetime import datetime
+import pytest
+from sqlalchemy.orm import make_transient_to_detached
+from app import create_app
+from cache import entity_cache, page_cache
+
+#----------------------------------------------------------------------------#
+# Fixtures.
+# The app runs on a throwaway SQLite file: enough for the engine events,
+# caches and routes that do not depend on Postgres types.
+#----------------------------------------------------------------------------#
+
+
+@pytest.fixture(scope='session')
+def app(tmp_path_factory):
+    path = tmp_path_factory.mktemp('db') / 'fyyur.db'
+    return create_app({
+        'TESTING': True,
+        'SECRET_KEY': 'testing',
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}',
+        'WTF_CSRF_ENABLED': False,
+        'LOG_FILE': None,
+        'LOG_REQUESTS': False,
+        'TEMPLATE_CACHE_DIR': None,
+    })
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    entity_cache.clear()
+    page_cache.backend.clear()
+    yield
+    entity_cache.clear()
+    page_cache.backend.clear()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def show(app):
+    # A show as loaded from the database, at venue 1 with artist 2
+    from models import Show
+    show = Show(1, 2, datetime(2030, 1, 1))
+    show.id = 5
+    make_transient_to_detached(show)
+    return show
+
+
+@pytest.fixture
+def no_flush(monkeypatch):
+    # Model writes run their cache and counter logic without a database
+    import models
+    from models import db
+    monkeypatch.setattr(db.session, 'flush', lambda: None)
+    monkeypatch.setattr(db.session, 'commit', lambda: None)
+    monkeypatch.setattr(models, 'refresh_show_counters', lambda model, criterion: None)
+
+
+class FakeResult(object):
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def all(self):
+        return list(self.rows)
+
+    def one(self):
+        return self.rows[0]
+
+    def first(self):
+        return self.rows[0] if self.rows else None
+
+
+class FakeQueries(object):
+    # Stands in for async_db.execute(): hands out the queued results in
+    # order and keeps the statements it was given
+
+    def __init__(self):
+        self.results = []
+        self.statements = []
+
+    def queue(self, *results):
+        self.results.extend(results)
+
+    async def execute(self, statement):
+        self.statements.append(statement)
+        return FakeResult(self.results.pop(0))
+
+
+@pytest.fixture
+def async_queries(monkeypatch):
+    from aio import async_db
+    queries = FakeQueries()
+    monkeypatch.setattr(async_db, 'execute', queries.execute)
+    return queries
+
+
+def call_asgi(application, method, path, query_string=b'', headers=(), body=b''):
+    # One HTTP request through the ASGI callable; returns the status, the
+    # headers and the body
+    scope = {
+        'type': 'http',
+        'http_version': '1.1',
+        'method': method,
+        'scheme': 'http',
+        'path': path,
+        'root_path': '',
+        'query_string': query_string,
+        'headers': [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers],
+        'server': ('testserver', 80),
+        'client': ('127.0.0.1', 50000),
+    }
+    incoming = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    sent = []
+
+    async def receive():
+        return incoming.pop(0) if incoming else {'type': 'http.disconnect'}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(application(scope, receive, send))
+    start = sent[0]
+    headers = {name.decode('latin-1'): value.decode('latin-1') for name, value in start['headers']}
+    body = b''.join(message.get('body', b'') for message in sent[1:])
+    return start['status'], headers, body
@@ -0,0 +1,102 @@
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+import pytest
+from aio import ASGIApp
+from conftest import call_asgi
+
+VenueRow = namedtuple('VenueRow', 'city state id name upcoming_shows_count')
+SearchRow = namedtuple('SearchRow', 'id name upcoming_shows_count total')
+
+# updated_at is timestamptz; older than ETAG_MIN_AGE, so pages get validators
+LAST_MODIFIED = datetime.now(timezone.utc) - timedelta(days=1)
+
+
+@pytest.fixture
+def asgi(app):
+    return ASGIApp(app)
+
+
+def test_get_async_view(asgi, async_queries):
+    async_queries.queue(
+        [(LAST_MODIFIED, 1)],
+        [VenueRow('San Francisco', 'CA', 1, 'The Musical Hop', 2)])
+    status, headers, body = call_asgi(asgi, 'GET', '/venues')
+    assert status == 200
+    assert b'The Musical Hop' in body
+    assert 'etag' in headers
+    # The validator query, then the listing
+    assert len(async_queries.statements) == 2
+
+
+def test_sync_route_falls_through_to_wsgi(asgi, async_queries):
+    status, headers, body = call_asgi(asgi, 'GET', '/')
+    assert status == 200
+    assert headers['content-type'].startswith('text/html')
+    assert async_queries.statements == []
+
+
+def test_not_modified(asgi, async_queries):
+    async_queries.queue(
+        [(LAST_MODIFIED, 1)],
+        [VenueRow('San Francisco', 'CA', 1, 'The Musical Hop', 2)])
+    status, headers, _ = call_asgi(asgi, 'GET', '/venues')
+    assert status == 200
+
+    async_queries.queue([(LAST_MODIFIED, 1)])
+    status, _, body = call_asgi(asgi, 'GET', '/venues', headers=[('If-None-Match', headers['etag'])])
+    assert status == 304
+    assert body == b''
+    # Answered from the validator alone
+    assert len(async_queries.statements) == 3
+
+
+def test_not_found(asgi, async_queries):
+    status, _, body = call_asgi(asgi, 'GET', '/no-such-page')
+    assert status == 404
+    assert async_queries.statements == []
+
+
+def test_missing_entity_is_not_found(asgi, async_queries, monkeypatch):
+    from aio import async_db
+
+    async def get(model, id):
+        return None
+
+    monkeypatch.setattr(async_db, 'get', get)
+    # No row for the validator, no shows
+    async_queries.queue([], [])
+    status, _, _ = call_asgi(asgi, 'GET', '/venues/404')
+    assert status == 404
+
+
+def test_head(asgi, async_queries):
+    async_queries.queue(
+        [(LAST_MODIFIED, 1)],
+        [VenueRow('San Francisco', 'CA', 1, 'The Musical Hop', 2)])
+    status, headers, body = call_asgi(asgi, 'HEAD', '/venues')
+    assert status == 200
+    assert 'etag' in headers
+    assert body == b''
+
+
+def test_post_search(asgi, async_queries):
+    async_queries.queue([SearchRow(1, 'The Musical Hop', 2, 1)])
+    status, _, body = call_asgi(
+        asgi, 'POST', '/venues/search',
+        headers=[('Content-Type', 'application/x-www-form-urlencoded')],
+        body=b'search_term=hop')
+    assert status == 200
+    assert b'The Musical Hop' in body
+    assert len(async_queries.statements) == 1
+
+
+def test_cache_bypass(app, asgi, async_queries, monkeypatch):
+    monkeypatch.setitem(app.config, 'CACHE_BYPASS', True)
+    rows = [VenueRow('San Francisco', 'CA', 1, 'The Musical Hop', 2)]
+    async_queries.queue(rows, rows)
+    for _ in range(2):
+        status, headers, _ = call_asgi(asgi, 'GET', '/venues')
+        assert status == 200
+        assert 'etag' not in headers
+    # No validator queries, and the listing rendered every time
+    assert len(async_queries.statements) == 2
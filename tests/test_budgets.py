@@ -0,0 +1,27 @@
+import pytest
+from sqlalchemy import text
+from budgets import QueryBudgetExceeded, query_budget
+from models import db
+
+
+def querying_view(queries, budget):
+    @query_budget(budget)
+    def view():
+        for _ in range(queries):
+            db.session.execute(text('SELECT 1'))
+        db.session.close()
+        return 'ok'
+    return view
+
+
+def test_budget_violation_raises(app, client, monkeypatch):
+    # Under TESTING the mode defaults to 'raise'
+    monkeypatch.setitem(app.view_functions, 'pages.index', querying_view(3, 2))
+    with pytest.raises(QueryBudgetExceeded, match='issued 3 SQL statements, budget is 2'):
+        client.get('/')
+
+
+def test_within_budget(app, client, monkeypatch):
+    monkeypatch.setitem(app.view_functions, 'pages.index', querying_view(2, 2))
+    response = client.get('/')
+    assert response.status_code == 200
@@ -0,0 +1,36 @@
+from cache import LRUCache, entity_cache
+
+
+def test_fill_after_invalidation_is_not_served():
+    # A request reads the cache and loads the row...
+    value, version = entity_cache.lookup('venue:1')
+    assert value is None
+    # ...a write commits and invalidates...
+    entity_cache.delete('venue:1')
+    # ...and the request stores what it loaded before the write
+    entity_cache.fill('venue:1', version, {'name': 'Old name'})
+    assert entity_cache.get('venue:1') is None
+
+
+def test_get_or_load():
+    loads = []
+
+    def loader():
+        loads.append(1)
+        return {'name': 'The Musical Hop'}
+
+    assert entity_cache.get_or_load('venue:1', loader) == {'name': 'The Musical Hop'}
+    assert entity_cache.get_or_load('venue:1', loader) == {'name': 'The Musical Hop'}
+    assert len(loads) == 1
+    entity_cache.delete('venue:1')
+    entity_cache.get_or_load('venue:1', loader)
+    assert len(loads) == 2
+
+
+def test_add_evicts_down_to_max_entries():
+    lru = LRUCache(max_entries=2)
+    for key in ('a', 'b', 'c'):
+        assert lru.add(key, key)
+    assert len(lru.entries) == 2
+    assert lru.get('a') is None
+    assert lru.get('c') == 'c'
@@ -0,0 +1,43 @@
+from datetime import datetime, timedelta, timezone
+import pytest
+from views import venues
+
+# Older than ETAG_MIN_AGE, so pages get validators
+LAST_MODIFIED = datetime.now(timezone.utc) - timedelta(days=1)
+
+
+@pytest.fixture
+def listing(monkeypatch):
+    renders = []
+
+    def render_venues():
+        renders.append(1)
+        return '<p>The Musical Hop</p>', None
+
+    monkeypatch.setattr(venues, 'listing_validator', lambda model: (LAST_MODIFIED, '1'))
+    monkeypatch.setattr(venues, 'render_venues', render_venues)
+    return renders
+
+
+def test_if_none_match(client, listing):
+    response = client.get('/venues')
+    assert response.status_code == 200
+    etag = response.headers['ETag']
+
+    response = client.get('/venues', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.data == b''
+    assert response.headers['ETag'] == etag
+    assert len(listing) == 1
+
+
+def test_if_modified_since(client, listing):
+    response = client.get('/venues')
+    response = client.get('/venues', headers={'If-Modified-Since': response.headers['Last-Modified']})
+    assert response.status_code == 304
+
+
+def test_stale_etag(client, listing):
+    response = client.get('/venues', headers={'If-None-Match': '"stale"'})
+    assert response.status_code == 200
+    assert b'The Musical Hop' in response.data
@@ -0,0 +1,26 @@
+import json
+from importer import MalformedRow, import_file, read_rows
+
+
+def test_malformed_jsonl_lines_are_passed_on(tmp_path):
+    path = tmp_path / 'venues.jsonl'
+    path.write_text('{"name": "The Musical Hop"}\n\n{"name": \n[1, 2]\n', encoding='utf-8')
+    rows = list(read_rows(str(path)))
+    assert rows[0] == (1, {'name': 'The Musical Hop'})
+    assert [line for line, _ in rows] == [1, 3, 4]
+    assert isinstance(rows[1][1], MalformedRow)
+    assert rows[2][1].error == 'Not a JSON object.'
+
+
+def test_malformed_jsonl_lines_are_rejected(app, tmp_path):
+    path = tmp_path / 'venues.jsonl'
+    path.write_text('{"name": \n\n{"name": "Park Square"\n', encoding='utf-8')
+    reject_file = tmp_path / 'rejects.jsonl'
+    with app.app_context():
+        stats = import_file('venues', str(path), reject_file=str(reject_file))
+    assert stats == {'read': 2, 'imported': 0, 'rejected': 2}
+
+    rejects = [json.loads(line) for line in reject_file.read_text(encoding='utf-8').splitlines()]
+    assert [reject['line'] for reject in rejects] == [1, 3]
+    assert rejects[1]['row'] == '{"name": "Park Square"'
+    assert rejects[1]['errors']['row'][0].startswith('Not valid JSON')
@@ -0,0 +1,11 @@
+import os
+
+
+def test_series_are_labelled_with_the_worker(client):
+    client.get('/')
+    body = client.get('/metrics').get_data(as_text=True)
+    worker = f'worker="{os.getpid()}"'
+    series = [line for line in body.splitlines() if line and not line.startswith('#')]
+    assert series
+    assert all(worker in line for line in series)
+    assert f'fyyur_request_duration_seconds_count{{endpoint="pages.index",method="GET",status="200",{worker}}}' in body
@@ -0,0 +1,24 @@
+import models
+from cache import entity_cache, cache_key
+
+
+def test_moved_show_has_both_parents(show):
+    show.venue_id = 3
+    assert show.parents() == ({1, 3}, {2})
+
+
+def test_show_update_refreshes_old_and_new_parents(app, show, no_flush, monkeypatch):
+    refreshed = []
+    monkeypatch.setattr(models, 'refresh_show_counters', lambda model, criterion: refreshed.append(criterion))
+    for key in ('venue_shows:1', 'venue_shows:3', 'artist_shows:2'):
+        entity_cache.fill(key, entity_cache.version(key), {})
+
+    with app.app_context():
+        show.venue_id = 3
+        show.update()
+
+    venue_ids = refreshed[0].right.value
+    assert set(venue_ids) == {1, 3}
+    assert entity_cache.get(cache_key('venue_shows', 1)) is None
+    assert entity_cache.get(cache_key('venue_shows', 3)) is None
+    assert entity_cache.get(cache_key('artist_shows', 2)) is None
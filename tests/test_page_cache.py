@@ -0,0 +1,38 @@
+import pytest
+from cache import page_cache
+from views import venues
+
+
+@pytest.fixture
+def renders(monkeypatch):
+    renders = []
+
+    def render_venues():
+        renders.append(1)
+        return f'<p>render {len(renders)}</p>', None
+
+    # No validators: every request reaches the view
+    monkeypatch.setattr(venues, 'listing_validator', lambda model: (None, ''))
+    monkeypatch.setattr(venues, 'render_venues', render_venues)
+    return renders
+
+
+def test_write_replaces_generation_token(app, show, no_flush):
+    with app.app_context():
+        before = {tag: page_cache.generation(tag) for tag in ('venues', 'artists', 'shows')}
+        show.update()
+        after = {tag: page_cache.generation(tag) for tag in ('venues', 'artists', 'shows')}
+    # Show writes touch /venues (counters) and /shows, not /artists
+    assert after['venues'] != before['venues']
+    assert after['shows'] != before['shows']
+    assert after['artists'] == before['artists']
+
+
+def test_write_invalidates_rendered_fragment(app, client, renders, show, no_flush):
+    assert b'render 1' in client.get('/venues').data
+    assert b'render 1' in client.get('/venues').data
+    assert len(renders) == 1
+
+    with app.app_context():
+        show.update()
+    assert b'render 2' in client.get('/venues').data
@@ -0,0 +1,41 @@
+import time
+import pytest
+from flask import g
+from cache import Version, entity_cache
+from replicas import Replica, replica_router
+
+
+@pytest.fixture
+def replica(app, monkeypatch):
+    monkeypatch.setattr(replica_router, 'replicas', [Replica('replica1', 'replica-engine')])
+    with app.test_request_context('/venues/1'):
+        g.replica_engine = 'replica-engine'
+        yield
+
+
+def fill_engine(key):
+    # The engine the cache fill of key reads from
+    engines = []
+    entity_cache.get_or_load(key, lambda: engines.append(replica_router.engine_for_request()) or {'id': 1})
+    return engines[0]
+
+
+def test_replica_starts_unhealthy():
+    assert not Replica('replica1', 'replica-engine').healthy
+
+
+def test_fill_never_written_reads_replica(replica):
+    assert fill_engine('venue:1') == 'replica-engine'
+
+
+def test_fill_after_recent_write_reads_primary(replica):
+    entity_cache.delete('venue:1')
+    assert fill_engine('venue:1') is None
+    # Back on the replica for the rest of the request
+    assert replica_router.engine_for_request() == 'replica-engine'
+
+
+def test_fill_after_settled_write_reads_replica(replica):
+    written_at = time.time() - replica_router.max_lag - replica_router.health_interval - 1
+    entity_cache.backend.set('version:venue:1', Version('token', written_at))
+    assert fill_engine('venue:1') == 'replica-engine'
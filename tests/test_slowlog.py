@@ -0,0 +1,28 @@
+import pytest
+from flask import Flask
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine
+from slowlog import SlowQueryLog
+
+
+@pytest.fixture
+def slow_log(app):
+    log = SlowQueryLog()
+    flask_app = Flask(__name__)
+    flask_app.config.update(SLOW_QUERY_LOG=True, SLOW_QUERY_THRESHOLD_MS=0, SLOW_QUERY_EXPLAIN_RATE=0)
+    with app.app_context():
+        from models import db
+        log.init_app(flask_app, db.engine)
+    yield log
+    for name, listener in (('before_cursor_execute', log.start_query),
+                           ('after_cursor_execute', log.finish_query),
+                           ('handle_error', log.fail_query)):
+        event.remove(Engine, name, listener)
+
+
+def test_statements_on_other_engines_are_logged(slow_log):
+    # A replica, say: any engine the app creates
+    engine = create_engine('sqlite://')
+    with engine.connect() as connection:
+        connection.execute(text('SELECT 1'))
+    assert [entry['statement'] for entry in slow_log.entries] == ['SELECT 1']
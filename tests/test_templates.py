@@ -0,0 +1,15 @@
+import pytest
+from views import artists, venues
+
+RESULTS = {'count': 0, 'page': 1, 'pages': 0, 'data': []}
+
+
+@pytest.mark.parametrize('module, path, placeholder', [
+    (venues, '/venues/search', b'Find a venue'),
+    (artists, '/artists/search', b'Find an artist'),
+])
+def test_search_results_keep_search_form(client, monkeypatch, module, path, placeholder):
+    monkeypatch.setattr(module, 'run_search', lambda model, search_term, page: RESULTS)
+    response = client.post(path, data={'search_term': 'hop'})
+    assert response.status_code == 200
+    assert placeholder in response.data
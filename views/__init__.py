@@ -0,0 +1,5 @@
+#----------------------------------------------------------------------------#
+# Blueprints.
+# venues, artists and shows hold their controllers; pages holds the home
+# page and the export endpoint. create_app() in app.py registers them.
+#----------------------------------------------------------------------------#
@@ -0,0 +1,300 @@
+#----------------------------------------------------------------------------#
+# Imports
+#----------------------------------------------------------------------------#
+
+from flask import Blueprint, current_app, render_template, request, flash, redirect, url_for, abort
+from markupsafe import Markup
+from sqlalchemy import select
+from forms import ArtistForm
+from models import db, Venue, Artist, Show
+from search import run_search, run_search_async
+from cache import entity_cache, page_cache, cache_key, fill_source
+from budgets import query_budget
+from conditional import conditional
+from aio import async_db, async_view
+from views.common import load_format, load_shows, load_page_async, entity_validator, listing_validator, \
+    entity_validator_async, listing_validator_async
+
+bp = Blueprint('artists', __name__)
+
+#----------------------------------------------------------------------------#
+# Helping Methods.
+#----------------------------------------------------------------------------#
+
+
+def artist_validator(artist_id):
+    return entity_validator(Artist, Show.artist_id, Venue, Show.venue_id, artist_id)
+
+
+def artists_validator():
+    return listing_validator(Artist)
+
+
+async def artist_validator_async(artist_id):
+    return await entity_validator_async(Artist, Show.artist_id, Venue, Show.venue_id, artist_id)
+
+
+async def artists_validator_async():
+    return await listing_validator_async(Artist)
+
+#----------------------------------------------------------------------------#
+# Controllers.
+#----------------------------------------------------------------------------#
+
+#-------------------------------Artists---------------------------------------#
+
+#  1-Create Artist
+#  ----------------------------------------------------------------
+@bp.route('/artists/create', methods=['GET'])
+@query_budget(0)
+def create_artist_form():
+    form = ArtistForm()
+    return render_template('forms/new_artist.html', form=form)
+
+
+@bp.route('/artists/create', methods=['POST'])
+@query_budget(6)
+def create_artist_submission():
+    error = False
+    try:
+        # Get User Input
+        req = request.form
+        name = req['name']
+        city = req['city']
+        state = req['state']
+        phone = req['phone']
+        genres = req.getlist('genres')
+        facebook_link = req['facebook_link']
+        # Craete Instanse from Artist
+        artist = Artist(name=name, genres=genres, city=city, state=state, phone=phone, facebook_link=facebook_link)
+        # Insert Artist Instanse
+        artist.insert()
+    except:
+        db.session.rollback()
+        error = True
+        current_app.logger.exception('Artist could not be listed')
+    finally:
+        db.session.close()
+
+    # Check Error Status
+    if error:
+        # on unsuccessful db insert
+        flash('An error occurred. Artist could not be listed.')
+        return render_template('pages/home.html')
+    else:
+        # on successful db insert, flash success
+        flash('Artist ' + request.form['name'] + ' was successfully listed!')
+        return render_template('pages/home.html')
+
+#  2-Read Artist
+#  ----------------------------------------------------------------
+
+
+@bp.route('/artists')
+@query_budget(2)
+@conditional(artists_validator)
+def artists():
+    error = False
+    content = None
+    try:
+        content = page_cache.get_or_render('artists', render_artists)
+    except:
+        db.session.rollback()
+        error = True
+        current_app.logger.exception('Artists page could not be rendered')
+    finally:
+        db.session.close()
+
+    # Check Error Status
+    if not error:
+        return render_template('pages/artists.html', content=Markup(content))
+    else:
+        abort(500)
+
+
+def artists_statement():
+    # Order all artists by name
+    return select(Artist.id, Artist.name).order_by(Artist.name)
+
+
+def artists_fragment(rows):
+    data = []
+    for artist in rows:
+        data.append({
+            "id": artist.id,
+            "name": artist.name
+        })
+    return render_template('fragments/artists.html', artists=data), None
+
+
+def render_artists():
+    return artists_fragment(db.session.execute(artists_statement()).all())
+
+#  3-Delete Artist
+#  ----------------------------------------------------------------
+
+
+@bp.route('/artists/<artist_id>', methods=['DELETE'])
+@query_budget(6)
+def delete_artist(artist_id):
+    error = False
+    try:
+        # Get Required Artist
+        artist = Artist.query.get(artist_id)
+        artist.delete()
+        current_app.logger.info('Artist %s deleted', artist_id)
+    except():
+        db.session.rollback()
+        error = True
+    finally:
+        db.session.close()
+
+    # Check Error Status
+    if error:
+        flash('An error occurred. Artist could not be deleted.')
+        return render_template('pages/home.html')
+    else:
+        return redirect(url_for('artists.artists'))
+
+#  4-Artists Search
+#  ----------------------------------------------------------------
+
+
+@bp.route('/artists/search', methods=['POST'])
+@query_budget(1)
+def search_artists():
+    response = {}
+    error = False
+    try:
+        search_term = request.form.get('search_term', '')
+        page = request.form.get('page', 1, type=int)
+        # Ranked page of matches with their upcoming shows counted
+        response = run_search(Artist, search_term, page)
+
+    except:
+        db.session.rollback()
+        error = True
+        current_app.logger.exception('Artist search failed')
+    finally:
+        db.session.close()
+
+    # Check Error Status
+    if not error:
+        return render_template('pages/search_artists.html', results=response, search_term=request.form.get('search_term', ''))
+    else:
+        abort(500)
+
+#  5-Artist Details
+#  ----------------------------------------------------------------
+
+
+@bp.route('/artists/<int:artist_id>')
+@query_budget(3)
+@conditional(artist_validator)
+def show_artist(artist_id):
+    artist = entity_cache.get_or_load(cache_key('artist', artist_id), lambda: load_format(Artist, artist_id))
+    if artist is None:
+        abort(404)
+    data = dict(artist)
+
+    key = cache_key('artist_shows', artist_id)
+    shows, version = entity_cache.lookup(key)
+    if shows is None:
+        with fill_source(version):
+            shows, ttl = load_shows(Show.artist_id, artist_id, Venue, Show.venue_id)
+        entity_cache.fill(key, version, shows, ttl)
+    data.update(shows)
+    return render_template('pages/show_artist.html', artist=data)
+
+#  6-Edit Artist
+#  ----------------------------------------------------------------
+
+
+@bp.route('/artists/<int:artist_id>/edit', methods=['GET'])
+@query_budget(1)
+def edit_artist(artist_id):
+    # From the primary, never the cache: a copy filled just before the last
+    # edit would put the old values back on submit
+    artist = load_format(Artist, artist_id)
+    if artist is None:
+        abort(404)
+    form = ArtistForm(data=artist)
+    return render_template('forms/edit_artist.html', form=form, artist=artist)
+
+
+@bp.route('/artists/<int:artist_id>/edit', methods=['POST'])
+@query_budget(4)
+def edit_artist_submission(artist_id):
+    error = False
+    try:
+        artist = Artist.query.get(artist_id)
+        form = ArtistForm(request.form, obj=artist)
+        form.populate_obj(artist)
+        artist.update()
+    except:
+        db.session.rollback()
+        error = True
+        current_app.logger.exception('Artist could not be updated')
+    finally:
+        db.session.close()
+
+    # Check Error Status
+    if not error:
+        return redirect(url_for('artists.show_artist', artist_id=artist_id))
+    else:
+        abort(500)
+
+#----------------------------------------------------------------------------#
+# Async Controllers.
+# The read routes above as coroutines, served under ASGI (see aio.py).
+#----------------------------------------------------------------------------#
+
+
+@async_view('artists.artists')
+@conditional(artists_validator_async)
+async def artists_async():
+    error = False
+    content = None
+    try:
+        content = await page_cache.get_or_render_async('artists', render_artists_async)
+    except Exception:
+        error = True
+        current_app.logger.exception('Artists page could not be rendered')
+
+    # Check Error Status
+    if not error:
+        return render_template('pages/artists.html', content=Markup(content))
+    else:
+        abort(500)
+
+
+async def render_artists_async():
+    return artists_fragment((await async_db.execute(artists_statement())).all())
+
+
+@async_view('artists.search_artists')
+async def search_artists_async():
+    response = {}
+    error = False
+    try:
+        search_term = request.form.get('search_term', '')
+        page = request.form.get('page', 1, type=int)
+        response = await run_search_async(Artist, search_term, page)
+    except Exception:
+        error = True
+        current_app.logger.exception('Artist search failed')
+
+    # Check Error Status
+    if not error:
+        return render_template('pages/search_artists.html', results=response, search_term=request.form.get('search_term', ''))
+    else:
+        abort(500)
+
+
+@async_view('artists.show_artist')
+@conditional(artist_validator_async)
+async def show_artist_async(artist_id):
+    data = await load_page_async(Artist, artist_id, Show.artist_id, Venue, Show.venue_id)
+    if data is None:
+        abort(404)
+    return render_template('pages/show_artist.html', artist=data)
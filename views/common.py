@@ -0,0 +1,157 @@
+#----------------------------------------------------------------------------#
+# Imports
+#----------------------------------------------------------------------------#
+
+import asyncio
+from datetime import datetime
+from sqlalchemy import func, select
+from models import db, Show
+from aio import async_db
+from cache import entity_cache, cache_key, fill_source
+from conditional import latest
+from formatting import date_formatter
+
+#----------------------------------------------------------------------------#
+# Helping Methods.
+# Shared by the venue and artist blueprints. Queries are built once and run
+# by the WSGI views on db.session, by the ASGI ones on async_db (aio.py).
+#----------------------------------------------------------------------------#
+
+
+def load_format(model, id):
+    entity = model.query.get(id)
+    return entity.format() if entity is not None else None
+
+
+def shows_statement(show_key, id, counterpart, counterpart_key, now):
+    # Shows of one venue/artist with the counterpart columns, partitioned and
+    # counted by the database against a single "now"
+    upcoming = (Show.date > now).label('upcoming')
+    return select(
+        counterpart_key,
+        counterpart.name,
+        counterpart.image_link,
+        Show.date,
+        upcoming,
+        func.count().over(partition_by=upcoming).label('shows_count')
+    ).join(counterpart, counterpart_key == counterpart.id) \
+        .filter(show_key == id) \
+        .order_by(Show.date)
+
+
+def partition_shows(shows, prefix, now):
+    # Also returns how long the partition holds: until the next upcoming
+    # show starts
+    data = {
+        'upcoming_shows': [],
+        'past_shows': [],
+        'upcoming_shows_count': 0,
+        'past_shows_count': 0
+    }
+    ttl = None
+    for counterpart_id, name, image_link, date, is_upcoming, shows_count in shows:
+        key = 'upcoming' if is_upcoming else 'past'
+        if is_upcoming and ttl is None:
+            ttl = (date - now).total_seconds()
+        data[key + '_shows_count'] = shows_count
+        data[key + '_shows'].append({
+            prefix + "_id": counterpart_id,
+            prefix + "_name": name,
+            prefix + "_image_link": image_link,
+            "start_time": date
+        })
+    date_formatter.format_shows(data['upcoming_shows'])
+    date_formatter.format_shows(data['past_shows'])
+    return data, ttl
+
+
+def load_shows(show_key, id, counterpart, counterpart_key):
+    now = datetime.now()
+    shows = db.session.execute(shows_statement(show_key, id, counterpart, counterpart_key, now)).all()
+    return partition_shows(shows, counterpart.__tablename__, now)
+
+
+async def load_format_async(model, id):
+    entity = await async_db.get(model, id)
+    return entity.format() if entity is not None else None
+
+
+async def load_shows_async(show_key, id, counterpart, counterpart_key):
+    now = datetime.now()
+    result = await async_db.execute(shows_statement(show_key, id, counterpart, counterpart_key, now))
+    return partition_shows(result.all(), counterpart.__tablename__, now)
+
+
+async def load_page_async(model, id, show_key, counterpart, counterpart_key):
+    # A detail page's entity and shows, from the entity cache or, for
+    # whichever is missing, from two queries issued together
+    kind = model.__tablename__
+    (entity, entity_version), (shows, shows_version) = await asyncio.gather(
+        entity_cache.lookup_async(cache_key(kind, id)), entity_cache.lookup_async(cache_key(kind + '_shows', id)))
+    loads = []
+    if entity is None:
+        loads.append(load_format_async(model, id))
+    if shows is None:
+        loads.append(load_shows_async(show_key, id, counterpart, counterpart_key))
+    with fill_source(entity_version, shows_version):
+        loaded = iter(await asyncio.gather(*loads))
+
+    if entity is None:
+        entity = next(loaded)
+        if entity is None:
+            return None
+        await entity_cache.fill_async(cache_key(kind, id), entity_version, entity)
+    if shows is None:
+        shows, ttl = next(loaded)
+        await entity_cache.fill_async(cache_key(kind + '_shows', id), shows_version, shows, ttl)
+    data = dict(entity)
+    data.update(shows)
+    return data
+
+
+#  Page validators (see conditional.py)
+#  ----------------------------------------------------------------
+
+
+def entity_statement(model, show_key, counterpart, counterpart_key, id):
+    # A detail page changes with the entity, its shows, the counterparts they
+    # name, and whenever one of its upcoming shows starts
+    now = datetime.now()
+    return select(
+        model.updated_at,
+        func.max(Show.updated_at),
+        func.max(counterpart.updated_at),
+        func.max(Show.date).filter(Show.date <= now)
+    ).outerjoin(Show, show_key == model.id) \
+        .outerjoin(counterpart, counterpart_key == counterpart.id) \
+        .filter(model.id == id) \
+        .group_by(model.id)
+
+
+def listing_statement(model):
+    # The row count catches deletes, which leave no timestamp behind
+    return select(func.max(model.updated_at), func.count(model.id))
+
+
+def entity_validator(model, show_key, counterpart, counterpart_key, id):
+    row = db.session.execute(entity_statement(model, show_key, counterpart, counterpart_key, id)).first()
+    if row is None:
+        return None
+    return latest(*row), ''
+
+
+def listing_validator(model):
+    last_modified, count = db.session.execute(listing_statement(model)).one()
+    return last_modified, str(count)
+
+
+async def entity_validator_async(model, show_key, counterpart, counterpart_key, id):
+    row = (await async_db.execute(entity_statement(model, show_key, counterpart, counterpart_key, id))).first()
+    if row is None:
+        return None
+    return latest(*row), ''
+
+
+async def listing_validator_async(model):
+    last_modified, count = (await async_db.execute(listing_statement(model))).one()
+    return last_modified, str(count)
@@ -0,0 +1,29 @@
+#----------------------------------------------------------------------------#
+# Imports
+#----------------------------------------------------------------------------#
+
+from flask import Blueprint, Response, render_template, stream_with_context
+from budgets import query_budget
+
+bp = Blueprint('pages', __name__)
+
+#----------------------------------------------------------------------------#
+# Controllers.
+#----------------------------------------------------------------------------#
+
+#-------------------------------Home Page---------------------------------------#
+@bp.route('/')
+@query_budget(0)
+def index():
+    return render_template('pages/home.html')
+
+#-------------------------------Export---------------------------------------#
+
+
+@bp.route('/export/<any(venues, artists, shows):kind>.<any(csv, jsonl):format>')
+def export(kind, format):
+    from exporter import generate_export, FORMATS as EXPORT_FORMATS
+    # Streamed with chunked transfer encoding, one chunk per batch of rows
+    response = Response(stream_with_context(generate_export(kind, format)), mimetype=EXPORT_FORMATS[format])
+    response.headers['Content-Disposition'] = f'attachment; filename={kind}.{format}'
+    return response
@@ -0,0 +1,234 @@
+#----------------------------------------------------------------------------#
+# Imports
+#----------------------------------------------------------------------------#
+
+from datetime import datetime, timedelta
+from flask import Blueprint, current_app, render_template, request, flash, url_for, abort
+from markupsafe import Markup
+from sqlalchemy import func, select, tuple_
+from forms import ShowForm
+from models import db, Venue, Artist, Show
+from cache import page_cache
+from budgets import query_budget
+from conditional import conditional, latest
+from formatting import date_formatter
+from aio import async_db, async_view
+
+bp = Blueprint('shows', __name__)
+
+SHOWS_PER_PAGE = 30
+SHOWS_MAX_PER_PAGE = 100
+
+#----------------------------------------------------------------------------#
+# Helping Methods.
+#----------------------------------------------------------------------------#
+
+
+def parse_date(value):
+    return datetime.strptime(value, '%Y-%m-%d')
+
+
+def encode_cursor(date, id):
+    # Opaque keyset position: the (date, id) of the last show on a page
+    return f"{date.isoformat()}_{id}"
+
+
+def decode_cursor(value):
+    date, id = value.rsplit('_', 1)
+    return datetime.fromisoformat(date), int(id)
+
+
+def shows_validator_statement():
+    now = datetime.now()
+    date_from = request.args.get('from', type=parse_date)
+    listed = Show.date >= date_from if date_from is not None else Show.date > now
+    return select(
+        select(func.max(Show.updated_at)).scalar_subquery(),
+        select(func.max(Venue.updated_at)).scalar_subquery(),
+        select(func.max(Artist.updated_at)).scalar_subquery(),
+        # Upcoming shows drop off the listing as they start
+        select(func.max(Show.date)).filter(Show.date <= now).scalar_subquery(),
+        select(func.count(Show.id)).filter(listed).scalar_subquery()
+    )
+
+
+def shows_validator():
+    row = db.session.execute(shows_validator_statement()).one()
+    return latest(*row[:4]), str(row[4])
+
+
+async def shows_validator_async():
+    row = (await async_db.execute(shows_validator_statement())).one()
+    return latest(*row[:4]), str(row[4])
+
+#----------------------------------------------------------------------------#
+# Controllers.
+#----------------------------------------------------------------------------#
+
+#-------------------------------Shows---------------------------------------#
+#  1-Create Show
+#  ----------------------------------------------------------------
+
+
+@bp.route('/shows/create')
+@query_budget(0)
+def create_shows():
+    # renders form. do not touch.
+    form = ShowForm()
+    return render_template('forms/new_show.html', form=form)
+
+
+@bp.route('/shows/create', methods=['POST'])
+@query_budget(7)
+def create_show_submission():
+    error = False
+    try:
+        req = request.form
+        venue_id = req['venue_id']
+        artist_id = req['artist_id']
+        date = req['start_time']
+        show = Show(venue_id=venue_id, artist_id=artist_id, date=date)
+        show.insert()
+    except:
+        db.session.rollback()
+        error = True
+        current_app.logger.exception('Show could not be listed')
+    finally:
+        db.session.close()
+
+    # Check Error Status
+    if error:
+        # on unsuccessful db insert
+        flash('An error occurred. Show could not be listed.')
+        return render_template('pages/home.html')
+    else:
+        # on successful db insert, flash success
+        flash('Show was successfully listed!')
+        return render_template('pages/home.html')
+
+#  2-Read Shows
+#  ----------------------------------------------------------------
+
+
+@bp.route('/shows')
+@query_budget(2)
+@conditional(shows_validator)
+def shows():
+    error = False
+    content = None
+    try:
+        content = page_cache.get_or_render('shows', render_shows)
+    except:
+        db.session.rollback()
+        error = True
+        current_app.logger.exception('Shows page could not be rendered')
+    finally:
+        db.session.close()
+
+    # Check Error Status
+    if not error:
+        return render_template('pages/shows.html', content=Markup(content))
+    else:
+        abort(500)
+
+
+def shows_statement(now):
+    # Paging & Filtering params
+    cursor = request.args.get('cursor', type=decode_cursor)
+    limit = max(1, min(request.args.get('limit', SHOWS_PER_PAGE, type=int), SHOWS_MAX_PER_PAGE))
+    date_from = request.args.get('from', type=parse_date)
+    date_to = request.args.get('to', type=parse_date)
+    venue_id = request.args.get('venue_id', type=int)
+    artist_id = request.args.get('artist_id', type=int)
+
+    query = select(
+        Show.id,
+        Show.date,
+        Show.venue_id,
+        Venue.name.label('venue_name'),
+        Show.artist_id,
+        Artist.name.label('artist_name'),
+        Artist.image_link.label('artist_image_link')
+    ).join(Venue, Show.venue_id == Venue.id) \
+        .join(Artist, Show.artist_id == Artist.id)
+
+    # Upcoming shows only, unless an explicit start date is given
+    if date_from is not None:
+        query = query.filter(Show.date >= date_from)
+    else:
+        query = query.filter(Show.date > now)
+    if date_to is not None:
+        query = query.filter(Show.date < date_to + timedelta(days=1))
+    if venue_id is not None:
+        query = query.filter(Show.venue_id == venue_id)
+    if artist_id is not None:
+        query = query.filter(Show.artist_id == artist_id)
+
+    # Seek past the last show of the previous page
+    if cursor is not None:
+        query = query.filter(tuple_(Show.date, Show.id) > cursor)
+
+    # Order all shows by Time, fetching one extra row to detect a next page
+    return query.order_by(Show.date, Show.id).limit(limit + 1), limit
+
+
+def shows_fragment(shows, limit, now):
+    data = []
+    next_url = None
+    ttl = None
+    for show in shows[:limit]:
+        data.append({
+            "venue_id": show.venue_id,
+            "venue_name": show.venue_name,
+            "artist_id": show.artist_id,
+            "artist_name": show.artist_name,
+            "artist_image_link": show.artist_image_link,
+            "start_time": show.date
+        })
+    date_formatter.format_shows(data)
+
+    if len(shows) > limit:
+        last = shows[limit - 1]
+        args = request.args.to_dict()
+        args['cursor'] = encode_cursor(last.date, last.id)
+        next_url = url_for('shows.shows', **args)
+
+    # The first upcoming show drops off the page when it starts
+    if request.args.get('from', type=parse_date) is None and shows:
+        ttl = (shows[0].date - now).total_seconds()
+    return render_template('fragments/shows.html', shows=data, next_url=next_url), ttl
+
+
+def render_shows():
+    now = datetime.now()
+    statement, limit = shows_statement(now)
+    return shows_fragment(db.session.execute(statement).all(), limit, now)
+
+#----------------------------------------------------------------------------#
+# Async Controllers.
+# The read routes above as coroutines, served under ASGI (see aio.py).
+#----------------------------------------------------------------------------#
+
+
+@async_view('shows.shows')
+@conditional(shows_validator_async)
+async def shows_async():
+    error = False
+    content = None
+    try:
+        content = await page_cache.get_or_render_async('shows', render_shows_async)
+    except Exception:
+        error = True
+        current_app.logger.exception('Shows page could not be rendered')
+
+    # Check Error Status
+    if not error:
+        return render_template('pages/shows.html', content=Markup(content))
+    else:
+        abort(500)
+
+
+async def render_shows_async():
+    now = datetime.now()
+    statement, limit = shows_statement(now)
+    return shows_fragment((await async_db.execute(statement)).all(), limit, now)
@@ -0,0 +1,320 @@
+#----------------------------------------------------------------------------#
+# Imports
+#----------------------------------------------------------------------------#
+
+from flask import Blueprint, current_app, render_template, request, flash, redirect, url_for, abort
+from markupsafe import Markup
+from sqlalchemy import select
+from forms import VenueForm
+from models import db, Venue, Artist, Show
+from search import run_search, run_search_async
+from cache import entity_cache, page_cache, cache_key, fill_source
+from budgets import query_budget
+from conditional import conditional
+from aio import async_db, async_view
+from views.common import load_format, load_shows, load_page_async, entity_validator, listing_validator, \
+    entity_validator_async, listing_validator_async
+
+bp = Blueprint('venues', __name__)
+
+#----------------------------------------------------------------------------#
+# Helping Methods.
+#----------------------------------------------------------------------------#
+
+
+def venue_validator(venue_id):
+    return entity_validator(Venue, Show.venue_id, Artist, Show.artist_id, venue_id)
+
+
+def venues_validator():
+    return listing_validator(Venue)
+
+
+async def venue_validator_async(venue_id):
+    return await entity_validator_async(Venue, Show.venue_id, Artist, Show.artist_id, venue_id)
+
+
+async def venues_validator_async():
+    return await listing_validator_async(Venue)
+
+#----------------------------------------------------------------------------#
+# Controllers.
+#----------------------------------------------------------------------------#
+
+#-------------------------------Venues---------------------------------------#
+
+#  1-Create Venue
+#  ----------------------------------------------------------------
+
+
+@bp.route('/venues/create', methods=['GET'])
+@query_budget(0)
+def create_venue_form():
+    form = VenueForm()
+    return render_template('forms/new_venue.html', form=form)
+
+
+@bp.route('/venues/create', methods=['POST'])
+@query_budget(6)
+def create_venue_submission():
+    error = False
+    try:
+        # Get User Input
+        req = request.form
+        name = req['name']
+        city = req['city']
+        state = req['state']
+        address = req['address']
+        phone = req['phone']
+        genres = req.getlist('genres')
+        facebook_link = req['facebook_link']
+        # Craete Instanse from Venue
+        venue = Venue(name=name, genres=genres, address=address, city=city, state=state, phone=phone, facebook_link=facebook_link)
+        # Insert Venue Instanse
+        venue.insert()
+    except:
+        db.session.rollback()
+        error = True
+        current_app.logger.exception('Venue could not be listed')
+    finally:
+        db.session.close()
+
+    # Check Error Status
+    if error:
+        # on unsuccessful db insert
+        flash('An error occurred. Venue could not be listed.')
+        return render_template('pages/home.html')
+    else:
+        # on successful db insert, flash success
+        flash('Venue' + request.form['name'] + ' was successfully listed!')
+        return render_template('pages/home.html')
+
+#  2-Read Venues
+#  ----------------------------------------------------------------
+
+
+@bp.route('/venues')
+@query_budget(2)
+@conditional(venues_validator)
+def venues():
+    error = False
+    content = None
+    try:
+        content = page_cache.get_or_render('venues', render_venues)
+    except:
+        db.session.rollback()
+        error = True
+        current_app.logger.exception('Venues page could not be rendered')
+    finally:
+        db.session.close()
+
+    # Check Error Status
+    if not error:
+        return render_template('pages/venues.html', content=Markup(content))
+    else:
+        abort(500)
+
+
+def venues_statement():
+    # One query: every venue with its maintained upcoming show counter
+    return select(
+        Venue.city,
+        Venue.state,
+        Venue.id,
+        Venue.name,
+        Venue.upcoming_shows_count
+    ).order_by(Venue.state, Venue.city, Venue.id)
+
+
+def venues_fragment(rows):
+    body = []
+    # Group venues by Location in a single pass
+    areas = {}
+    for row in rows:
+        location = (row.city, row.state)
+        if location not in areas:
+            areas[location] = {
+                "city": row.city,
+                "state": row.state,
+                "venues": []
+            }
+            body.append(areas[location])
+        areas[location]['venues'].append({
+            "id": row.id,
+            "name": row.name,
+            "num_upcoming_shows": row.upcoming_shows_count
+        })
+    return render_template('fragments/venues.html', areas=body), None
+
+
+def render_venues():
+    return venues_fragment(db.session.execute(venues_statement()).all())
+
+#  3-Delete Venues
+#  ----------------------------------------------------------------
+
+
+@bp.route('/venues/<venue_id>', methods=['DELETE'])
+@query_budget(6)
+def delete_venue(venue_id):
+    error = False
+    try:
+        # Get Required Venue
+        venue = Venue.query.get(venue_id)
+        venue.delete()
+    except():
+        db.session.rollback()
+        error = True
+    finally:
+        db.session.close()
+
+    # Check Error Status
+    if error:
+        # on Error State
+        flash('An error occurred. Venue could not be deleted.')
+        return render_template('pages/home.html')
+    else:
+        return redirect(url_for('venues.venues'))
+
+#  4-Venues Search
+#  ----------------------------------------------------------------
+
+
+@bp.route('/venues/search', methods=['POST'])
+@query_budget(1)
+def search_venues():
+    response = {}
+    error = False
+    try:
+        search_term = request.form.get('search_term', '')
+        page = request.form.get('page', 1, type=int)
+        # Ranked page of matches with their upcoming shows counted
+        response = run_search(Venue, search_term, page)
+
+    except:
+        db.session.rollback()
+        error = True
+        current_app.logger.exception('Venue search failed')
+    finally:
+        db.session.close()
+
+    # Check Error Status
+    if not error:
+        return render_template('pages/search_venues.html', results=response, search_term=request.form.get('search_term', ''))
+    else:
+        abort(500)
+
+#  5-Venues Details
+#  ----------------------------------------------------------------
+
+
+@bp.route('/venues/<int:venue_id>', methods=['GET'])
+@query_budget(3)
+@conditional(venue_validator)
+def show_venue(venue_id):
+    venue = entity_cache.get_or_load(cache_key('venue', venue_id), lambda: load_format(Venue, venue_id))
+    if venue is None:
+        abort(404)
+    data = dict(venue)
+
+    key = cache_key('venue_shows', venue_id)
+    shows, version = entity_cache.lookup(key)
+    if shows is None:
+        with fill_source(version):
+            shows, ttl = load_shows(Show.venue_id, venue_id, Artist, Show.artist_id)
+        entity_cache.fill(key, version, shows, ttl)
+    data.update(shows)
+    return render_template('pages/show_venue.html', venue=data)
+
+#  5-Edit Venue
+#  ----------------------------------------------------------------
+
+
+@bp.route('/venues/<int:venue_id>/edit', methods=['GET'])
+@query_budget(1)
+def edit_venue(venue_id):
+    # From the primary, never the cache: a copy filled just before the last
+    # edit would put the old values back on submit
+    venue = load_format(Venue, venue_id)
+    if venue is None:
+        abort(404)
+    form = VenueForm(data=venue)
+    return render_template('forms/edit_venue.html', form=form, venue=venue)
+
+
+@bp.route('/venues/<int:venue_id>/edit', methods=['POST'])
+@query_budget(4)
+def edit_venue_submission(venue_id):
+    error = False
+    try:
+        venue = Venue.query.get(venue_id)
+        form = VenueForm(request.form, obj=venue)
+        form.populate_obj(venue)
+        venue.update()
+    except:
+        db.session.rollback()
+        error = True
+        current_app.logger.exception('Venue could not be updated')
+    finally:
+        db.session.close()
+
+    # Check Error Status
+    if not error:
+        return redirect(url_for('venues.show_venue', venue_id=venue_id))
+    else:
+        abort(500)
+
+#----------------------------------------------------------------------------#
+# Async Controllers.
+# The read routes above as coroutines, served under ASGI (see aio.py).
+#----------------------------------------------------------------------------#
+
+
+@async_view('venues.venues')
+@conditional(venues_validator_async)
+async def venues_async():
+    error = False
+    content = None
+    try:
+        content = await page_cache.get_or_render_async('venues', render_venues_async)
+    except Exception:
+        error = True
+        current_app.logger.exception('Venues page could not be rendered')
+
+    # Check Error Status
+    if not error:
+        return render_template('pages/venues.html', content=Markup(content))
+    else:
+        abort(500)
+
+
+async def render_venues_async():
+    return venues_fragment((await async_db.execute(venues_statement())).all())
+
+
+@async_view('venues.search_venues')
+async def search_venues_async():
+    response = {}
+    error = False
+    try:
+        search_term = request.form.get('search_term', '')
+        page = request.form.get('page', 1, type=int)
+        response = await run_search_async(Venue, search_term, page)
+    except Exception:
+        error = True
+        current_app.logger.exception('Venue search failed')
+
+    # Check Error Status
+    if not error:
+        return render_template('pages/search_venues.html', results=response, search_term=request.form.get('search_term', ''))
+    else:
+        abort(500)
+
+
+@async_view('venues.show_venue')
+@conditional(venue_validator_async)
+async def show_venue_async(venue_id):
+    data = await load_page_async(Venue, venue_id, Show.venue_id, Artist, Show.artist_id)
+    if data is None:
+        abort(404)
+    return render_template('pages/show_venue.html', venue=data)